@@ -0,0 +1,101 @@
+"""
+Persistent, content-addressed cache for Gemini analysis results.
+
+Key = hash of the frame bytes, the prompt template version, the frame
+selection settings and the patient context. Each entry is a small JSON file
+(response text + measured blink stats) plus the rendered PDF. The directory
+is kept under a byte budget by evicting the least recently used entries.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = ".cache/analysis"
+DEFAULT_MAX_MB = 200
+
+
+def analysis_cache_key(frames, prompt_version: str, **context) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"v={prompt_version}\n".encode())
+    h.update(json.dumps(context, sort_keys=True, default=str).encode())
+    for frame in frames:
+        # Length prefix keeps frame boundaries part of the key
+        h.update(len(frame).to_bytes(8, "little"))
+        h.update(frame)
+    return h.hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _paths(self, key: str):
+        return self.directory / f"{key}.json", self.directory / f"{key}.pdf"
+
+    def get(self, key: str) -> dict | None:
+        meta_path, pdf_path = self._paths(key)
+        with self._lock:
+            try:
+                entry = json.loads(meta_path.read_text(encoding="utf-8"))
+                entry["pdf"] = pdf_path.read_bytes() if pdf_path.exists() else None
+            except (FileNotFoundError, ValueError):
+                self.misses += 1
+                return None
+
+            # mtime doubles as "last used" for LRU eviction
+            for p in (meta_path, pdf_path):
+                if p.exists():
+                    os.utime(p)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, text: str, pdf: bytes | None = None, blink_stats: dict | None = None):
+        meta_path, pdf_path = self._paths(key)
+        with self._lock:
+            if pdf:
+                _atomic_write(pdf_path, pdf)
+            _atomic_write(meta_path, json.dumps({"text": text, "blink_stats": blink_stats}).encode("utf-8"))
+            self._evict_locked()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(list(self.directory.glob("*.json"))),
+                "bytes": sum(p.stat().st_size for p in self.directory.iterdir() if p.is_file()),
+            }
+
+    def _evict_locked(self):
+        entries = {}
+        for p in self.directory.iterdir():
+            if p.suffix not in (".json", ".pdf"):
+                continue
+            st = p.stat()
+            size, mtime = entries.get(p.stem, (0, 0.0))
+            entries[p.stem] = (size + st.st_size, max(mtime, st.st_mtime))
+
+        total = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda kv: kv[1][1]):
+            if total <= self.max_bytes:
+                break
+            for p in self._paths(key):
+                p.unlink(missing_ok=True)
+            total -= size
+            self.evictions += 1
+
+
+def _atomic_write(path: Path, data: bytes):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
@@ -0,0 +1,294 @@
+"""
+The Analyze path of the Blink Analysis page, without Streamlit.
+
+analyze() runs every step after the capture is loaded: local blink
+measurement, eye-region crops, the upload (JPEG parts, a video clip or
+contact sheets, or parallel windows in chunked mode), the Gemini call
+(streamed or not) and the PDF. The page passes AnalysisHooks that draw
+spinners, metrics and the streamed text; load_harness.py uses the no-op
+defaults, so both time exactly the same work.
+
+analysis_key() is the cache key for a capture under these options; the
+callers do the lookup and store themselves, since only they know how to
+show a saved result.
+"""
+
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+
+from analysis_cache import analysis_cache_key
+from analysis_prompt import (
+    PROMPT_VERSION, build_prompt, build_contents, build_video_prompt,
+    build_contact_sheet_prompt, build_contact_sheet_contents,
+)
+from blink_engine import analyze_frames, frame_timestamps
+from chunked_analysis import analyze_chunked, DEFAULT_WINDOW, DEFAULT_OVERLAP, DEFAULT_WORKERS
+from contact_sheet import DEFAULT_COLS, DEFAULT_ROWS, DEFAULT_TILE_WIDTH, build_contact_sheets, parse_grid
+from eye_crop import EyeCropper, eye_region_box, locate_eyes, DEFAULT_MAX_WIDTH, DEFAULT_QUALITY
+from frame_video import DEFAULT_CODEC, encode_clip
+from keyframes import select_keyframes, DEFAULT_MAX_FRAMES
+from settings import get_setting
+
+
+@dataclass
+class AnalysisOptions:
+    # "keyframes" sends only frames around blinks (capped), "all" sends every frame
+    selection: str = "keyframes"
+    max_frames: int = DEFAULT_MAX_FRAMES
+    # "single" = one request, "chunked" = overlapping windows in parallel + a merge request
+    mode: str = "single"
+    chunk_window: int = DEFAULT_WINDOW
+    chunk_overlap: int = DEFAULT_OVERLAP
+    chunk_workers: int = DEFAULT_WORKERS
+    # Single mode: "images" = one JPEG part per frame sent, "video" = every frame as one clip,
+    # "contact_sheet" = every frame as numbered tiles on a few grid images
+    upload: str = "images"
+    video_codec: str = DEFAULT_CODEC
+    contact_sheet_grid: tuple[int, int] = (DEFAULT_COLS, DEFAULT_ROWS)
+    contact_sheet_tile_width: int = DEFAULT_TILE_WIDTH
+    # Send only a padded box around both eyes, re-encoded at this width / quality
+    eye_crop: bool = True
+    eye_crop_width: int = DEFAULT_MAX_WIDTH
+    eye_crop_quality: int = DEFAULT_QUALITY
+    # Show the single-request answer (and build its PDF) as it is generated
+    stream: bool = True
+    # Local FaceMesh blink measurement before the upload
+    measure_blinks: bool = True
+
+    @classmethod
+    def from_settings(cls) -> "AnalysisOptions":
+        return cls(
+            selection=get_setting("FRAME_SELECTION", "keyframes"),
+            max_frames=get_setting("MAX_FRAMES_PER_REQUEST", DEFAULT_MAX_FRAMES, int),
+            mode=get_setting("ANALYSIS_MODE", "single"),
+            chunk_window=get_setting("CHUNK_WINDOW", DEFAULT_WINDOW, int),
+            chunk_overlap=get_setting("CHUNK_OVERLAP", DEFAULT_OVERLAP, int),
+            chunk_workers=get_setting("CHUNK_WORKERS", DEFAULT_WORKERS, int),
+            upload=get_setting("UPLOAD_MODE", "images"),
+            video_codec=get_setting("VIDEO_CODEC", DEFAULT_CODEC),
+            contact_sheet_grid=parse_grid(get_setting("CONTACT_SHEET_GRID", f"{DEFAULT_COLS}x{DEFAULT_ROWS}")),
+            contact_sheet_tile_width=get_setting("CONTACT_SHEET_TILE_WIDTH", DEFAULT_TILE_WIDTH, int),
+            eye_crop=get_setting("EYE_CROP", True, bool),
+            eye_crop_width=get_setting("EYE_CROP_WIDTH", DEFAULT_MAX_WIDTH, int),
+            eye_crop_quality=get_setting("EYE_CROP_QUALITY", DEFAULT_QUALITY, int),
+            stream=get_setting("STREAM_RESPONSES", True, bool),
+        )
+
+
+def analysis_key(frames, gemini, options: AnalysisOptions, country: str, city: str, age: int) -> str:
+    """Cache key for this capture analysed with these options and details."""
+    chunked = options.mode == "chunked"
+    if chunked:
+        upload_options = None
+    elif options.upload == "video":
+        upload_options = options.video_codec
+    elif options.upload == "contact_sheet":
+        upload_options = (options.contact_sheet_grid, options.contact_sheet_tile_width)
+    else:
+        upload_options = None
+    return analysis_cache_key(
+        frames,
+        PROMPT_VERSION,
+        model=gemini.model_name,
+        generation_config=gemini.generation_config,
+        mode=options.mode,
+        selection=options.selection,
+        max_frames=options.max_frames,
+        window=(options.chunk_window, options.chunk_overlap) if chunked else None,
+        upload=None if chunked else options.upload,
+        upload_options=upload_options,
+        eye_crop=(options.eye_crop_width, options.eye_crop_quality) if options.eye_crop else None,
+        timestamps=None if frames.timestamps_ms is None else frames.timestamps_ms.round(1).tolist(),
+        blinks=options.measure_blinks,
+        country=country,
+        city=city,
+        age=int(age),
+    )
+
+
+@dataclass
+class Upload:
+    frames: object                  # as sent: an EyeCropper, or the capture itself
+    contents: list = field(default_factory=list)
+    sent_frames: int = 0
+    payload_bytes: int = 0
+    message: str = ""               # what the spinner says during the Gemini call
+    clip: object = None
+    sheets: list | None = None
+
+
+@dataclass
+class AnalysisResult:
+    text: str
+    pdf: bytes | None
+    blink_stats: dict | None
+    upload: Upload
+    complete: bool = True           # False when chunked windows failed; don't cache it
+    ttft_ms: float | None = None
+
+
+class AnalysisHooks:
+    """What the page draws between the steps; every hook does nothing by default."""
+
+    def busy(self, message: str):
+        return nullcontext()
+
+    def blinks_measured(self, blink_stats: dict):
+        pass
+
+    def blinks_failed(self, error: Exception):
+        pass
+
+    def windows_failed(self, chunked):
+        pass
+
+    def stream_started(self, upload: Upload):
+        pass
+
+    def streamed(self, text: str, done: bool):
+        pass
+
+    def show_results(self, text: str, upload: Upload):
+        pass
+
+
+def _upload_frames(frames, blink_analysis, options: AnalysisOptions, profile):
+    """Frames as they will be uploaded (eye crops, or the originals).
+    Crops are made lazily, so their cost shows up in the gemini spans."""
+    if not options.eye_crop:
+        return frames
+    with profile.span("eye_locate"):
+        if blink_analysis is not None and blink_analysis.frame_size is not None:
+            eye_box = eye_region_box(blink_analysis.landmarks, blink_analysis.frame_size)
+        else:
+            eye_box = locate_eyes(frames)
+    if eye_box is None:
+        return frames
+    return EyeCropper(frames, eye_box, options.eye_crop_width, options.eye_crop_quality)
+
+
+def _build_upload(frames, upload_frames, blink_analysis, blink_stats, options: AnalysisOptions,
+                  country, city, age, profile, hooks: AnalysisHooks) -> Upload:
+    upload = Upload(upload_frames)
+    if options.upload == "video":
+        with hooks.busy(f"Encoding {len(frames)} frames as a video clip..."):
+            with profile.span("encode_video", codec=options.video_codec) as span:
+                clip = encode_clip(upload_frames, frames.timestamps_ms, options.video_codec)
+                prompt = build_video_prompt(len(frames), clip.frames, clip.duration_s, clip.fps,
+                                            country, city, age, blink_stats)
+                upload.contents = [prompt, clip.part()]
+                upload.payload_bytes = len(clip.data)
+                span["frames"] = clip.frames
+                span["bytes"] = upload.payload_bytes
+        upload.clip = clip
+        upload.sent_frames = clip.frames
+        upload.message = f"Analyzing a {clip.duration_s} s clip of {clip.frames} frames with Gemini AI..."
+    elif options.upload == "contact_sheet":
+        with profile.span("contact_sheets") as span:
+            sheets = build_contact_sheets(upload_frames, frames.timestamps_ms, *options.contact_sheet_grid,
+                                          tile_width=options.contact_sheet_tile_width)
+            prompt = build_contact_sheet_prompt(len(frames), sheets, country, city, age, blink_stats)
+            upload.contents = build_contact_sheet_contents(prompt, sheets)
+            upload.payload_bytes = sum(len(s.data) for s in sheets)
+            span["frames"] = len(frames)
+            span["images"] = len(sheets)
+            span["bytes"] = upload.payload_bytes
+        upload.sheets = sheets
+        upload.sent_frames = len(frames)
+        upload.message = f"Analyzing {len(frames)} frames on {len(sheets)} contact sheets with Gemini AI..."
+    else:
+        with profile.span("build_contents") as span:
+            max_frames = len(frames) if options.selection == "all" else options.max_frames
+            keyframes = select_keyframes(blink_analysis, len(frames), max_frames=max_frames,
+                                         timestamps_ms=frames.timestamps_ms)
+            prompt = build_prompt(len(frames), keyframes, country, city, age, blink_stats)
+            upload.contents = build_contents(prompt, upload_frames, keyframes)
+            upload.payload_bytes = sum(len(part["data"]) for part in upload.contents if isinstance(part, dict))
+            span["frames"] = len(keyframes)
+            span["bytes"] = upload.payload_bytes
+        upload.sent_frames = len(keyframes)
+        upload.message = f"Analyzing {len(keyframes)} of {len(frames)} frames with Gemini AI..."
+    return upload
+
+
+def analyze(gemini, frames, country: str, city: str, age: int, options: AnalysisOptions, profile,
+            hooks: AnalysisHooks | None = None) -> AnalysisResult:
+    """Everything after the cache lookup, timed as spans of profile (a RequestProfile)."""
+    hooks = hooks or AnalysisHooks()
+
+    # Local, deterministic blink measurements (no API call)
+    blink_analysis, blink_stats = None, None
+    if options.measure_blinks:
+        try:
+            with hooks.busy(f"Measuring blinks in {len(frames)} frames..."):
+                with profile.span("blink_measure", frames=len(frames)):
+                    blink_analysis = analyze_frames(frames, frames.timestamps_ms)
+            blink_stats = blink_analysis.summary()
+            hooks.blinks_measured(blink_stats)
+        except Exception as e:
+            hooks.blinks_failed(e)
+
+    upload_frames = _upload_frames(frames, blink_analysis, options, profile)
+
+    report, ttft_ms, complete = None, None, True
+    if options.mode == "chunked":
+        upload = Upload(upload_frames, sent_frames=len(frames))
+        timestamps = blink_analysis.timestamps_ms if blink_analysis is not None else frame_timestamps(len(frames), frames.timestamps_ms)
+        with hooks.busy(f"Analyzing {len(frames)} frames in parallel windows with Gemini AI..."):
+            with profile.span("gemini_chunked", frames=len(frames)) as span:
+                chunked = analyze_chunked(
+                    gemini, upload_frames, timestamps, country, city, age, blink_stats,
+                    window=options.chunk_window, overlap=options.chunk_overlap, max_workers=options.chunk_workers,
+                )
+                upload.payload_bytes = sum(len(memoryview(upload_frames[i])) for i in range(len(frames)))
+                span["requests"] = len(chunked.windows) + 1
+                span["bytes"] = upload.payload_bytes
+        text = chunked.text
+        if chunked.failed:
+            complete = False
+            hooks.windows_failed(chunked)
+    else:
+        upload = _build_upload(frames, upload_frames, blink_analysis, blink_stats, options,
+                               country, city, age, profile, hooks)
+        if options.stream:
+            from pdf_report import StreamingReport
+
+            # Each chunk is shown and converted for the PDF as it arrives
+            report = StreamingReport(bytes(frames[0]))
+            hooks.stream_started(upload)
+            stream = gemini.stream_content(upload.contents)
+            with hooks.busy(upload.message):
+                with profile.span("gemini_stream", frames=upload.sent_frames, bytes=upload.payload_bytes) as span:
+                    for chunk in stream:
+                        report.feed(chunk)
+                        hooks.streamed(stream.text, False)
+                    span["ttft_ms"] = stream.ttft_ms
+                    span["chunks"] = stream.chunks
+            hooks.streamed(stream.text, True)
+            text, ttft_ms = stream.text, stream.ttft_ms
+        else:
+            with hooks.busy(upload.message):
+                with profile.span("gemini", frames=upload.sent_frames, bytes=upload.payload_bytes):
+                    text = gemini.generate_content(upload.contents).text
+
+    if report is not None:
+        # Only the layout is left: the text was converted while it streamed
+        with hooks.busy("Preparing your PDF report..."):
+            with profile.span("pdf_finish") as span:
+                pdf = report.finish()
+                span["bytes"] = len(pdf)
+    else:
+        # Render the PDF in the background while the results are shown
+        from pdf_report import submit_report
+
+        pdf_future = submit_report(text, bytes(frames[0]))
+        with profile.span("render_results"):
+            hooks.show_results(text, upload)
+
+        # Only the time spent waiting: the render overlaps with the results above
+        with hooks.busy("Preparing your PDF report..."):
+            with profile.span("pdf_wait") as span:
+                pdf = pdf_future.result()
+                span["bytes"] = len(pdf or b"")
+
+    return AnalysisResult(text, pdf, blink_stats, upload, complete, ttft_ms)
@@ -0,0 +1,154 @@
+"""
+Prompt template for the Gemini blink analysis.
+
+Bump PROMPT_VERSION whenever the wording or the content layout changes;
+it is part of the analysis cache key.
+"""
+
+from contact_sheet import ContactSheet
+from keyframes import Keyframe
+
+PROMPT_VERSION = "4"
+
+
+def build_prompt(
+    frame_count: int,
+    keyframes: list[Keyframe],
+    country: str,
+    city: str,
+    age: int,
+    blink_stats: dict | None = None,
+) -> str:
+    if len(keyframes) < frame_count:
+        intro = (
+            f"You are given {len(keyframes)} eye images (keyframes) selected from "
+            f"{frame_count} sequential webcam frames. Each image is preceded by its "
+            "frame number, capture time and why it was selected."
+        )
+    else:
+        intro = f"You are given {frame_count} sequential eye images (frames) from a webcam."
+
+    return f"\n{intro}\n{_task_and_context(country, city, age, blink_stats)}"
+
+
+def _task_and_context(country: str, city: str, age: int, blink_stats: dict | None) -> str:
+    measured = ""
+    if blink_stats is not None and blink_stats["blink_count"] is None:
+        measured = f"""
+Local eye-landmark measurement: face not detected in enough frames ({blink_stats["face_frames"]}/{blink_stats["frames"]}),
+so there are no measured blink counts. Judge from the images only and say if the eyes are not clearly visible.
+"""
+    elif blink_stats is not None:
+        measured = f"""
+Measured locally from eye landmarks (treat as ground truth for counts and timing):
+- Blinks detected: {blink_stats["blink_count"]} over {blink_stats["duration_s"]} s
+- Blink durations (ms): {blink_stats["blink_durations_ms"] or "none"}
+- Frames with a detected face: {blink_stats["face_frames"]}/{blink_stats["frames"]}
+"""
+
+    return f"""Task: Check for possible blinking problems or abnormal blinking patterns.
+
+- You cannot diagnose.
+- Give careful observations and safe advice only.
+- Keep it short and focused.
+- List urgent red flags that require an eye doctor.
+
+Patient context:
+- Country: {country}
+- City: {city}
+- Age: {age}
+{measured}"""
+
+
+def build_contents(prompt: str, frames, keyframes: list[Keyframe]) -> list:
+    """Prompt followed by the selected frames, each labelled when not all are sent."""
+    labelled = len(keyframes) < len(frames)
+    contents = [prompt]
+    for kf in keyframes:
+        if labelled:
+            contents.append(kf.label())
+        contents.append({"mime_type": "image/jpeg", "data": bytes(frames[kf.index])})
+    return contents
+
+
+def build_video_prompt(
+    frame_count: int,
+    clip_frames: int,
+    duration_s: float,
+    fps: float,
+    country: str,
+    city: str,
+    age: int,
+    blink_stats: dict | None = None,
+) -> str:
+    intro = (
+        f"You are given a {duration_s} s video clip of {clip_frames} of {frame_count} sequential "
+        f"webcam eye frames, captured at about {fps} fps. Clip time is capture time: "
+        f"frame N is at about N / {fps} s. Refer to moments by clip time."
+    )
+    return f"\n{intro}\n{_task_and_context(country, city, age, blink_stats)}"
+
+
+def build_contact_sheet_prompt(
+    frame_count: int,
+    sheets: list[ContactSheet],
+    country: str,
+    city: str,
+    age: int,
+    blink_stats: dict | None = None,
+) -> str:
+    cols, rows = sheets[0].cols, sheets[0].rows
+    intro = (
+        f"You are given {len(sheets)} contact sheets holding {frame_count} sequential webcam eye frames, "
+        f"{cols * rows} per sheet in a {cols}x{rows} grid read left to right, top to bottom. "
+        "Every tile is stamped with its frame number (#N) and each sheet is preceded by the "
+        "frames and times it covers. Refer to moments by frame number."
+    )
+    return f"\n{intro}\n{_task_and_context(country, city, age, blink_stats)}"
+
+
+def build_contact_sheet_contents(prompt: str, sheets: list[ContactSheet]) -> list:
+    contents = [prompt]
+    for sheet in sheets:
+        contents.append(sheet.label())
+        contents.append(sheet.part())
+    return contents
+
+
+def build_window_prompt(window_no: int, window_count: int, first: int, last: int, frame_count: int) -> str:
+    return f"""
+You are given frames {first}-{last} (window {window_no} of {window_count}) from a
+sequence of {frame_count} webcam eye frames. Each image is preceded by its frame
+number and capture time. Neighbouring windows overlap by a few frames.
+
+Task: describe only what you see in this window that matters for blinking:
+when the eyes close and reopen (give frame numbers), incomplete blinks,
+one eye closing alone, redness, squinting, tearing or anything unusual.
+Plain bullet points, no advice, no diagnosis.
+"""
+
+
+def build_reduce_prompt(
+    window_notes: list[tuple[int, int, str]],
+    frame_count: int,
+    failed_windows: list[tuple[int, int]],
+    country: str,
+    city: str,
+    age: int,
+    blink_stats: dict | None = None,
+) -> str:
+    """Merge per-window observations into the final report (text only, no images)."""
+    notes = "\n\n".join(f"Frames {first}-{last}:\n{text.strip()}" for first, last, text in window_notes)
+    gaps = ""
+    if failed_windows:
+        ranges = ", ".join(f"{first}-{last}" for first, last in failed_windows)
+        gaps = f"\nNo observations are available for frames {ranges}; say so if it matters.\n"
+
+    intro = (
+        f"Below are observations from overlapping windows of {frame_count} sequential "
+        "webcam eye frames. Overlapping windows may describe the same blink twice; count it once."
+    )
+    return (
+        f"\n{intro}\n{_task_and_context(country, city, age, blink_stats)}{gaps}"
+        f"\nWindow observations:\n\n{notes}\n"
+    )
@@ -0,0 +1,60 @@
+"""
+Pre-resized copies of the static images shown on the pages.
+
+The first request for (image, width) writes a copy sized for that display
+width (2x for high-DPI screens) into .cache/assets; later runs just return
+its path. Falls back to the original file if resizing is not possible.
+resized_jpeg() does the same for image bytes, e.g. capture previews.
+"""
+
+import io
+import os
+
+CACHE_DIR = ".cache/assets"
+DPI_SCALE = 2
+
+
+def resized_asset(path: str, width: int) -> str:
+    if not os.path.exists(path):
+        return path
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    stamp = int(os.stat(path).st_mtime)
+    for ext in (".jpg", ".png"):
+        cached = os.path.join(CACHE_DIR, f"{stem}_{width}w_{stamp}{ext}")
+        if os.path.exists(cached):
+            return cached
+
+    try:
+        from PIL import Image
+
+        with Image.open(path) as img:
+            target = min(img.width, width * DPI_SCALE)
+            img.thumbnail((target, round(img.height * target / img.width)), Image.LANCZOS)
+
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            if img.mode in ("RGBA", "LA", "P"):
+                cached = os.path.join(CACHE_DIR, f"{stem}_{width}w_{stamp}.png")
+                img.save(cached + ".tmp", format="PNG", optimize=True)
+            else:
+                cached = os.path.join(CACHE_DIR, f"{stem}_{width}w_{stamp}.jpg")
+                img.convert("RGB").save(cached + ".tmp", format="JPEG", quality=88, optimize=True)
+            os.replace(cached + ".tmp", cached)
+            return cached
+    except Exception:
+        return path
+
+
+def resized_jpeg(data, width: int, quality: int = 80) -> bytes:
+    """JPEG bytes downscaled to at most `width` px; the input as-is if that fails."""
+    try:
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as img:
+            if img.width > width:
+                img.thumbnail((width, round(img.height * width / img.width)), Image.LANCZOS)
+            out = io.BytesIO()
+            img.convert("RGB").save(out, format="JPEG", quality=quality, optimize=True)
+            return out.getvalue()
+    except Exception:
+        return bytes(data)
@@ -0,0 +1,158 @@
+"""
+Offline blink analysis for recorded footage, without Streamlit.
+
+Scores every video file (decoded with av) and every capture upload
+(.blnk container or .zip of frames, as produced by the Blink Analysis page)
+with the same EAR blink detection the app uses. One file per task on a
+process pool; each worker process has its own FaceMesh. Rows are written
+as soon as each file finishes, so partial results survive an interrupt.
+
+    python batch_cli.py recordings/ --csv results.csv --json results.jsonl
+    python batch_cli.py a.mp4 b.zip --workers 4
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".m4v", ".mkv", ".webm", ".avi"}
+CAPTURE_EXTENSIONS = {".zip", ".blnk"}
+
+CSV_FIELDS = [
+    "file", "kind", "frames", "face_frames", "duration_s", "fps",
+    "blink_count", "blinks_per_minute", "mean_blink_ms", "elapsed_s", "error",
+]
+
+
+def find_inputs(paths: list[str], recursive: bool = False) -> list[str]:
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                walk = ((root, names) for root, _, names in os.walk(path))
+            else:
+                walk = [(path, os.listdir(path))]
+            for root, names in walk:
+                for name in sorted(names):
+                    if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS | CAPTURE_EXTENSIONS:
+                        found.append(os.path.join(root, name))
+        elif os.path.isfile(path):
+            found.append(path)
+        else:
+            print(f"skipping {path}: not found", file=sys.stderr)
+    return found
+
+
+# ---------------------------
+# Worker side
+# ---------------------------
+
+def _init_worker():
+    # One process per core: keep OpenCV from starting its own thread pool in each
+    import cv2
+
+    cv2.setNumThreads(1)
+
+
+def _video_frames(path: str, timestamps_ms: list[float]):
+    """Decode a video to BGR arrays, collecting each frame's presentation time."""
+    import av
+
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        for frame in container.decode(stream):
+            timestamps_ms.append(float(frame.time) * 1000 if frame.time is not None else float("nan"))
+            yield frame.to_ndarray(format="bgr24")
+
+
+def analyze_file(path: str) -> dict:
+    from blink_engine import analyze_frames, analyze_landmarks, extract_eye_landmarks
+
+    t0 = time.perf_counter()
+    ext = os.path.splitext(path)[1].lower()
+    row = {"file": path, "kind": "capture" if ext in CAPTURE_EXTENSIONS else "video"}
+    try:
+        if ext in CAPTURE_EXTENSIONS:
+            from frame_container import load_capture
+
+            with open(path, "rb") as f:
+                capture = load_capture(f.read())
+            analysis = analyze_frames(capture.frames, capture.timestamps_ms)
+        else:
+            timestamps: list[float] = []
+            landmarks, frame_size = extract_eye_landmarks(_video_frames(path, timestamps))
+            analysis = analyze_landmarks(landmarks, timestamps, frame_size)
+
+        summary = analysis.summary()
+        row.update(summary)
+        row["fps"] = round((summary["frames"] - 1) / summary["duration_s"], 2) if summary["duration_s"] else None
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["elapsed_s"] = round(time.perf_counter() - t0, 2)
+    return row
+
+
+# ---------------------------
+# Driver
+# ---------------------------
+
+def run(files: list[str], workers: int, csv_path: str | None, json_path: str | None) -> int:
+    csv_file = open(csv_path, "w", newline="", encoding="utf-8") if csv_path else None
+    if csv_path is None and json_path is None:
+        csv_file = sys.stdout
+    json_file = open(json_path, "w", encoding="utf-8") if json_path else None
+
+    writer = None
+    if csv_file is not None:
+        writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+
+    failed = 0
+    t0 = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(analyze_file, path) for path in files]
+            for done, future in enumerate(as_completed(futures), 1):
+                row = future.result()
+                failed += "error" in row
+                if writer is not None:
+                    writer.writerow(row)
+                    csv_file.flush()
+                if json_file is not None:
+                    json_file.write(json.dumps(row) + "\n")
+                    json_file.flush()
+                blinks = "face not detected" if row.get("blink_count") is None else f"{row['blink_count']} blinks"
+                status = row.get("error") or f"{blinks}, {row.get('frames')} frames"
+                print(f"[{done}/{len(files)}] {row['file']}: {status} ({row['elapsed_s']} s)", file=sys.stderr)
+    finally:
+        for f in (csv_file, json_file):
+            if f is not None and f is not sys.stdout:
+                f.close()
+
+    print(f"{len(files)} files in {time.perf_counter() - t0:.1f} s with {workers} workers, {failed} failed", file=sys.stderr)
+    return failed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Score blink rate in recorded videos and frame captures.")
+    parser.add_argument("inputs", nargs="+", help="video files, .zip/.blnk captures, or directories of them")
+    parser.add_argument("-r", "--recursive", action="store_true", help="search directories recursively")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="worker processes (default: all cores)")
+    parser.add_argument("--csv", help="write one CSV row per file here (default: stdout if --json is not given)")
+    parser.add_argument("--json", help="write one JSON object per file here (JSON Lines, includes blink durations)")
+    args = parser.parse_args(argv)
+
+    files = find_inputs(args.inputs, args.recursive)
+    if not files:
+        parser.error("no video or capture files found")
+
+    workers = max(1, min(args.workers, len(files)))
+    return 1 if run(files, workers, args.csv, args.json) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""
+Benchmarks for the Blink Analysis hot paths.
+
+Every stage runs on synthetic fixtures (seeded, so runs are comparable) and
+a stubbed Gemini model, so no camera, FaceMesh model or API key is needed.
+For each stage: median / best wall time over a few repeats, and the peak
+traced Python allocation of one extra run under tracemalloc (timed runs
+are not traced, tracing slows them down).
+
+    python bench_suite.py                          # run everything
+    python bench_suite.py --only pdf,ear           # some stages
+    python bench_suite.py --save bench_baseline.json
+    python bench_suite.py --compare bench_baseline.json --tolerance 0.25
+
+--compare exits with status 1 if any stage got slower, or uses more memory,
+than the baseline by more than the tolerance.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from fixtures import synthetic_frames, zip_frames
+
+FRAME_COUNT = 120
+FRAME_SIZE = (480, 640)
+LONG_SEQUENCE = 30 * 60 * 10   # ten minutes at 30 fps, for the EAR maths
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.25
+
+REPORT_MARKDOWN = """## Blink Observations
+Across the captured sequence the eyelids close fully in most blinks. **Blink rate** is within the normal range.
+
+| Metric | Value | Typical range |
+|---|---|---|
+| Blinks per minute | 14 | 15-20 |
+| Mean blink duration | 210 ms | 100-400 ms |
+| Incomplete blinks | 2 | 0-3 |
+| Face visible | 118/120 frames | - |
+
+## Eye Appearance
+No visible redness or swelling in the sampled frames. Lighting is adequate.
+
+| Frame | Observation |
+|---|---|
+| 12 | Eyes open, relaxed |
+| 47 | Full closure |
+| 48 | Reopening |
+| 90 | Slight squint |
+
+## Suggestions
+Follow the 20-20-20 rule and keep the screen slightly below eye level.
+"""
+
+
+# ---------------------------
+# Fixtures
+# ---------------------------
+
+class StubModel:
+    """Stands in for GeminiClient / GenerativeModel: records nothing, answers instantly."""
+
+    class _Response:
+        def __init__(self, text):
+            self.text = text
+
+    model_name = "stub"
+
+    def generate_content(self, contents, **kwargs):
+        return self._Response(REPORT_MARKDOWN)
+
+
+def synthetic_landmarks(n: int, blink_every: int = 90, blink_len: int = 6) -> np.ndarray:
+    """(n, 12, 2) eye landmarks in blink_engine order with a regular blink pattern."""
+    rng = np.random.default_rng(1)
+    # p1..p6 of an open eye, unit width; right eye then left eye
+    eye = np.array([[0, 0], [0.3, -0.15], [0.7, -0.15], [1, 0], [0.7, 0.15], [0.3, 0.15]])
+    both = np.concatenate([eye * 30 + (200, 220), eye * 30 + (300, 220)])
+
+    openness = np.ones(n)
+    for start in range(blink_every // 2, n - blink_len, blink_every):
+        openness[start:start + blink_len] = np.abs(np.linspace(-1, 1, blink_len)) * 0.9 + 0.05
+
+    pts = np.repeat(both[None], n, axis=0)
+    centre_y = 220
+    pts[:, :, 1] = centre_y + (pts[:, :, 1] - centre_y) * openness[:, None]
+    pts += rng.normal(0, 0.2, pts.shape)
+    return pts
+
+
+# ---------------------------
+# Stages
+# ---------------------------
+# Each entry returns a zero-argument callable; fixture setup stays outside the timing.
+
+def stage_decode_zip(fx):
+    from frame_container import load_capture
+
+    return lambda: load_capture(fx["zip"])
+
+
+def stage_decode_container(fx):
+    from frame_container import load_capture
+
+    return lambda: load_capture(fx["container"])
+
+
+def stage_frame_store(fx):
+    from frame_store import FrameStore
+
+    def run():
+        FrameStore(fx["frames"]).close()
+    return run
+
+
+def stage_build_contents(fx):
+    from analysis_prompt import build_contents, build_prompt
+    from keyframes import select_keyframes
+
+    analysis = fx["analysis"]
+    stats = analysis.summary()
+
+    def run():
+        keyframes = select_keyframes(analysis, len(fx["frames"]))
+        prompt = build_prompt(len(fx["frames"]), keyframes, "Egypt", "Cairo", 30, stats)
+        contents = build_contents(prompt, fx["frames"], keyframes)
+        return StubModel().generate_content(contents).text
+    return run
+
+
+def stage_encode_video(fx):
+    from frame_video import encode_clip
+
+    return lambda: encode_clip(fx["frames"], fx["timestamps"])
+
+
+def stage_contact_sheets(fx):
+    from contact_sheet import build_contact_sheets
+
+    return lambda: build_contact_sheets(fx["frames"], fx["timestamps"])
+
+
+def stage_chunked_stub(fx):
+    from chunked_analysis import analyze_chunked
+
+    analysis = fx["analysis"]
+    stats = analysis.summary()
+    return lambda: analyze_chunked(StubModel(), fx["frames"], analysis.timestamps_ms, "Egypt", "Cairo", 30, stats)
+
+
+def stage_pdf(fx):
+    from pdf_report import generate_pdf_from_text_and_image
+
+    return lambda: generate_pdf_from_text_and_image(REPORT_MARKDOWN, fx["frames"][0])
+
+
+def stage_locations(fx):
+    from location_index import build_index
+
+    def run():
+        index = build_index(fx["countries_csv"])
+        for country in index.countries:
+            index.cities(country)
+    return run
+
+
+def stage_location_lookups(fx):
+    from location_index import build_index
+
+    index = build_index(fx["countries_csv"])
+
+    def run():
+        for country in index.countries:
+            index.cities(country)
+    return run
+
+
+def stage_ear(fx):
+    from blink_engine import analyze_landmarks
+
+    return lambda: analyze_landmarks(fx["landmarks"])
+
+
+STAGES = {
+    "decode_zip": stage_decode_zip,
+    "decode_container": stage_decode_container,
+    "frame_store": stage_frame_store,
+    "build_contents": stage_build_contents,
+    "encode_video": stage_encode_video,
+    "contact_sheets": stage_contact_sheets,
+    "chunked_stub": stage_chunked_stub,
+    "pdf": stage_pdf,
+    "locations_build": stage_locations,
+    "location_lookups": stage_location_lookups,
+    "ear": stage_ear,
+}
+
+
+def build_fixtures(countries_csv: str = "countries.csv") -> dict:
+    from blink_engine import analyze_landmarks
+    from frame_container import pack_frames
+
+    frames = synthetic_frames(FRAME_COUNT, FRAME_SIZE)
+    timestamps = np.arange(len(frames)) * 33.3
+    return {
+        "frames": frames,
+        "zip": zip_frames(frames),
+        "container": pack_frames(frames, timestamps),
+        "timestamps": timestamps,
+        # Blink analysis of the capture, as the page has it before building contents
+        "analysis": analyze_landmarks(synthetic_landmarks(len(frames), blink_every=40), timestamps, (FRAME_SIZE[1], FRAME_SIZE[0])),
+        "landmarks": synthetic_landmarks(LONG_SEQUENCE),
+        "countries_csv": countries_csv,
+    }
+
+
+# ---------------------------
+# Runner
+# ---------------------------
+
+def measure(fn, repeat: int = DEFAULT_REPEAT) -> dict:
+    fn()  # warm-up: lazy imports, lru caches
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(times), 3),
+        "best_ms": round(min(times), 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def run_suite(names=None, repeat: int = DEFAULT_REPEAT, countries_csv: str = "countries.csv") -> dict:
+    names = list(names or STAGES)
+    fixtures = build_fixtures(countries_csv)
+    results = {}
+    for name in names:
+        results[name] = measure(STAGES[name](fixtures), repeat)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """Regression messages for stages slower / bigger than baseline * (1 + tolerance)."""
+    regressions = []
+    for name, row in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key in ("median_ms", "peak_kb"):
+            if base[key] > 0 and row[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {base[key]} -> {row[key]} (+{row[key] / base[key] - 1:.0%})")
+    return regressions
+
+
+def print_table(results: dict, baseline: dict | None = None):
+    print(f"{'stage':<20}{'median ms':>12}{'best ms':>12}{'peak KB':>12}{'vs base':>10}")
+    for name, row in results.items():
+        delta = ""
+        if baseline and name in baseline and baseline[name]["median_ms"] > 0:
+            delta = f"{row['median_ms'] / baseline[name]['median_ms'] - 1:+.0%}"
+        print(f"{name:<20}{row['median_ms']:>12}{row['best_ms']:>12}{row['peak_kb']:>12}{delta:>10}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time and memory per Blink Analysis stage.")
+    parser.add_argument("--only", help=f"comma-separated stages ({', '.join(STAGES)})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--countries", default="countries.csv", help="location CSV for the location stages")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a baseline file")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown, 0.25 = 25%%")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(",") if args.only else None
+    unknown = [n for n in names or [] if n not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    results = run_suite(names, args.repeat, args.countries)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["stages"]
+    print_table(results, baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "repeat": args.repeat, "stages": results}, f, indent=2)
+        print(f"baseline saved to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
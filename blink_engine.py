@@ -0,0 +1,368 @@
+"""
+Server-side blink detection for a captured frame sequence.
+
+Same EAR maths as the JavaScript in pages/Blink_Monitor.py, but FaceMesh runs
+once over the whole sequence and the baseline / threshold / blink events are
+computed as NumPy array operations instead of a per-frame state machine.
+"""
+
+import threading
+import warnings
+from dataclasses import dataclass, field
+from typing import Iterable, Sequence
+
+import numpy as np
+
+# ---------------------------
+# Parameters (kept in sync with pages/Blink_Monitor.py)
+# ---------------------------
+
+# p1..p6 for each eye, same order as the R / L objects in the monitor
+RIGHT_EYE = (33, 160, 158, 133, 153, 144)
+LEFT_EYE = (362, 385, 387, 263, 373, 380)
+EYE_LANDMARKS = RIGHT_EYE + LEFT_EYE
+
+EMA_ALPHA = 0.08           # baseline smoothing for the streaming detector
+THRESH_RATIO = 0.72        # threshold = baseline * this
+OPEN_FLOOR_RATIO = 0.6     # frames below baseline * this never feed the baseline
+MIN_CLOSED_FRAMES = 2      # must be closed for at least this many frames
+BASELINE_WINDOW = 90       # frames per baseline block on long sequences
+MIN_FACE_FRACTION = 0.5    # below this share of frames with a face, counts are not reported
+
+# The capture loop sleeps 30 ms between frames; used when no timestamps are sent
+DEFAULT_FRAME_INTERVAL_MS = 30.0
+
+
+@dataclass
+class BlinkEvent:
+    start: int          # first closed frame
+    trough: int         # frame with the lowest EAR
+    end: int            # first frame with the eye open again
+    duration_ms: float
+
+
+@dataclass
+class BlinkAnalysis:
+    ear: np.ndarray             # (n,) mean EAR of both eyes, NaN without a face
+    baseline: np.ndarray        # (n,) open-eye EAR baseline
+    threshold: np.ndarray       # (n,) baseline * THRESH_RATIO
+    timestamps_ms: np.ndarray   # (n,) capture time of each frame
+    landmarks: np.ndarray       # (n, 12, 2) eye landmarks in pixels, NaN without a face
+    events: list[BlinkEvent] = field(default_factory=list)
+    frame_size: tuple[int, int] | None = None  # (width, height)
+
+    @property
+    def frame_count(self) -> int:
+        return int(self.ear.shape[0])
+
+    @property
+    def face_frames(self) -> int:
+        return int(np.count_nonzero(~np.isnan(self.ear)))
+
+    @property
+    def face_detected(self) -> bool:
+        """Enough frames with a face for the blink counts to mean anything."""
+        return self.face_frames > 0 and self.face_frames >= MIN_FACE_FRACTION * self.frame_count
+
+    @property
+    def blink_count(self) -> int | None:
+        if not self.face_detected:
+            return None
+        return len(self.events)
+
+    @property
+    def duration_s(self) -> float:
+        if self.frame_count < 2:
+            return 0.0
+        return float(self.timestamps_ms[-1] - self.timestamps_ms[0]) / 1000.0
+
+    @property
+    def blinks_per_minute(self) -> float | None:
+        if self.blink_count is None or self.duration_s <= 0:
+            return None
+        return self.blink_count * 60.0 / self.duration_s
+
+    @property
+    def mean_blink_ms(self) -> float | None:
+        if not self.face_detected or not self.events:
+            return None
+        return float(np.mean([e.duration_ms for e in self.events]))
+
+    def summary(self) -> dict:
+        return {
+            "frames": self.frame_count,
+            "face_frames": self.face_frames,
+            "face_detected": self.face_detected,
+            "duration_s": round(self.duration_s, 2),
+            "blink_count": self.blink_count,
+            "blinks_per_minute": None if self.blinks_per_minute is None else round(self.blinks_per_minute, 1),
+            "mean_blink_ms": None if self.mean_blink_ms is None else round(self.mean_blink_ms, 1),
+            "blink_durations_ms": [round(e.duration_ms, 1) for e in self.events] if self.face_detected else [],
+        }
+
+
+# ---------------------------
+# FaceMesh (one instance per process)
+# ---------------------------
+
+_face_mesh = None
+_face_mesh_lock = threading.Lock()
+
+
+def create_face_mesh():
+    """New FaceMesh with the same options as the browser monitor."""
+    import mediapipe as mp
+
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=False,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+    )
+
+
+def get_face_mesh():
+    """Return the process-wide FaceMesh instance, creating it on first use."""
+    global _face_mesh
+    if _face_mesh is None:
+        _face_mesh = create_face_mesh()
+    return _face_mesh
+
+
+def eye_points(face_mesh, img: np.ndarray) -> np.ndarray | None:
+    """(12, 2) eye landmarks in pixels for one BGR image, or None without a face."""
+    import cv2
+
+    h, w = img.shape[:2]
+    results = face_mesh.process(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    if not results.multi_face_landmarks:
+        return None
+    lm = results.multi_face_landmarks[0].landmark
+    return np.array([(lm[i].x * w, lm[i].y * h) for i in EYE_LANDMARKS])
+
+
+def decode_jpeg(data) -> np.ndarray | None:
+    """Decode JPEG bytes (or any buffer) into a BGR image."""
+    import cv2
+
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def extract_eye_landmarks(images: Iterable[np.ndarray | None]):
+    """
+    Run FaceMesh over a sequence of BGR images.
+    Returns ((n, 12, 2) pixel landmarks with NaN rows for frames without a face,
+    (width, height) of the first decoded frame or None).
+    """
+    rows = []
+    frame_size = None
+    idx = list(EYE_LANDMARKS)
+
+    # FaceMesh is not thread-safe and tracks across calls, so one sequence at a time
+    with _face_mesh_lock:
+        face_mesh = get_face_mesh()
+        for img in images:
+            if img is None:
+                rows.append(np.full((len(idx), 2), np.nan))
+                continue
+
+            if frame_size is None:
+                frame_size = (img.shape[1], img.shape[0])
+
+            pts = eye_points(face_mesh, img)
+            rows.append(np.full((len(idx), 2), np.nan) if pts is None else pts)
+
+    if not rows:
+        return np.empty((0, len(idx), 2)), frame_size
+    return np.stack(rows), frame_size
+
+
+# ---------------------------
+# Array maths
+# ---------------------------
+
+def compute_ear(landmarks: np.ndarray) -> np.ndarray:
+    """Mean EAR of both eyes for every frame; NaN where no face was found."""
+    pts = landmarks.reshape(-1, 2, 6, 2)  # frame, eye, p1..p6, xy
+
+    def dist(a, b):
+        return np.linalg.norm(pts[:, :, a] - pts[:, :, b], axis=-1)
+
+    vert1 = dist(1, 5)   # p2 - p6
+    vert2 = dist(2, 4)   # p3 - p5
+    horiz = dist(0, 3)   # p1 - p4
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ear = (vert1 + vert2) / (2.0 * horiz)
+    ear[horiz <= 1e-6] = np.nan
+    return ear.mean(axis=1)
+
+
+def compute_baseline(ear: np.ndarray, window: int = BASELINE_WINDOW) -> np.ndarray:
+    """
+    Open-eye EAR baseline per frame.
+    The median is taken only over frames above OPEN_FLOOR_RATIO of a first
+    estimate, so blinks don't drag it down (same idea as the EMA floor in the monitor).
+    Long sequences are split into blocks and interpolated between block centres.
+    """
+    n = ear.shape[0]
+    if n == 0 or np.all(np.isnan(ear)):
+        return np.full(n, np.nan)
+
+    blocks = max(1, int(np.ceil(n / window)))
+    size = int(np.ceil(n / blocks))
+    padded = np.full(blocks * size, np.nan)
+    padded[:n] = ear
+    padded = padded.reshape(blocks, size)
+
+    # Face-less blocks are all NaN; nanmedian warns about those, we handle them below
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        first = np.nanmedian(padded, axis=1, keepdims=True)
+        open_only = np.where(padded > first * OPEN_FLOOR_RATIO, padded, np.nan)
+        block_base = np.nanmedian(open_only, axis=1)
+
+    # Blocks without a face borrow from their neighbours
+    valid = ~np.isnan(block_base)
+    centres = np.arange(blocks) * size + (size - 1) / 2.0
+    return np.interp(np.arange(n), centres[valid], block_base[valid])
+
+
+def frame_timestamps(n: int, timestamps_ms: Sequence[float] | None = None) -> np.ndarray:
+    if timestamps_ms is not None and len(timestamps_ms) == n:
+        return np.asarray(timestamps_ms, dtype=np.float64)
+    return np.arange(n, dtype=np.float64) * DEFAULT_FRAME_INTERVAL_MS
+
+
+def detect_blinks(
+    ear: np.ndarray,
+    threshold: np.ndarray,
+    timestamps_ms: np.ndarray,
+    min_closed_frames: int = MIN_CLOSED_FRAMES,
+) -> list[BlinkEvent]:
+    """
+    Blink = a run of at least `min_closed_frames` frames below threshold that
+    ends with the eye open again inside the sequence (the monitor also only
+    counts a blink once the eye reopens).
+    """
+    n = ear.shape[0]
+    with np.errstate(invalid="ignore"):
+        closed = ear < threshold  # NaN compares False, i.e. "no face" counts as open
+
+    edges = np.diff(np.concatenate(([0], closed.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)  # exclusive: first open frame
+
+    keep = ((ends - starts) >= min_closed_frames) & (ends < n)
+    starts, ends = starts[keep], ends[keep]
+
+    events = []
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        trough = s + int(np.nanargmin(ear[s:e]))
+        events.append(BlinkEvent(
+            start=s,
+            trough=trough,
+            end=e,
+            duration_ms=float(timestamps_ms[e] - timestamps_ms[s]),
+        ))
+    return events
+
+
+def analyze_landmarks(
+    landmarks: np.ndarray,
+    timestamps_ms: Sequence[float] | None = None,
+    frame_size: tuple[int, int] | None = None,
+) -> BlinkAnalysis:
+    ear = compute_ear(landmarks)
+    baseline = compute_baseline(ear)
+    threshold = baseline * THRESH_RATIO
+    ts = frame_timestamps(ear.shape[0], timestamps_ms)
+
+    return BlinkAnalysis(
+        ear=ear,
+        baseline=baseline,
+        threshold=threshold,
+        timestamps_ms=ts,
+        landmarks=landmarks,
+        events=detect_blinks(ear, threshold, ts),
+        frame_size=frame_size,
+    )
+
+
+def analyze_images(
+    images: Iterable[np.ndarray | None],
+    timestamps_ms: Sequence[float] | None = None,
+) -> BlinkAnalysis:
+    landmarks, frame_size = extract_eye_landmarks(images)
+    return analyze_landmarks(landmarks, timestamps_ms, frame_size)
+
+
+def analyze_frames(
+    frames: Sequence[bytes],
+    timestamps_ms: Sequence[float] | None = None,
+) -> BlinkAnalysis:
+    """Decode JPEG frames and run the full blink analysis over them."""
+    return analyze_images((decode_jpeg(f) for f in frames), timestamps_ms)
+
+
+# ---------------------------
+# Streaming (one frame at a time)
+# ---------------------------
+
+class StreamingBlinkDetector:
+    """
+    Frame-by-frame blink detector for live video, a port of the EMA state
+    machine in onResults() of pages/Blink_Monitor.py.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.base_ear: float | None = None
+        self.closed_frames = 0
+        self.in_blink = False
+        self.blink_start_ms = 0.0
+        self.last_ear: float | None = None
+
+    @property
+    def threshold(self) -> float | None:
+        return None if self.base_ear is None else self.base_ear * THRESH_RATIO
+
+    @property
+    def eyes_closed(self) -> bool:
+        return self.closed_frames > 0
+
+    def update(self, landmarks: np.ndarray | None, now_ms: float) -> float | None:
+        """
+        Feed one frame's (12, 2) eye landmarks (None without a face).
+        Returns the blink duration in ms when a blink just finished, else None.
+        """
+        if landmarks is None:
+            self.last_ear = None
+            return None
+
+        ear = float(compute_ear(landmarks[np.newaxis])[0])
+        if np.isnan(ear):
+            return None
+        self.last_ear = ear
+
+        # Baseline only follows frames that look open, so blinks don't drag it down
+        if self.base_ear is None:
+            self.base_ear = ear
+        elif ear > self.base_ear * OPEN_FLOOR_RATIO:
+            self.base_ear = (1 - EMA_ALPHA) * self.base_ear + EMA_ALPHA * ear
+
+        if ear < self.threshold:
+            if self.closed_frames == 0:
+                self.blink_start_ms = now_ms
+            self.closed_frames += 1
+            if not self.in_blink and self.closed_frames >= MIN_CLOSED_FRAMES:
+                self.in_blink = True
+            return None
+
+        finished = self.in_blink
+        self.in_blink = False
+        self.closed_frames = 0
+        return now_ms - self.blink_start_ms if finished else None
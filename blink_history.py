@@ -0,0 +1,274 @@
+"""
+Persistent blink-session history (SQLite, WAL).
+
+The Blink Monitor component sends a batch about once a minute. A batch holds
+the blink events since the last batch plus per-minute rollups:
+
+    {
+      "session_id": "...", "source": "browser", "started_at": <epoch s>,
+      "events":  [{"t": <epoch s>, "duration_ms": 180.0, "minute": 0}, ...],
+      "minutes": [{"minute": 0, "started_at": <epoch s>, "blinks": 14, "complete": true, "seconds": 60.0}, ...]
+    }
+
+`seconds` is how much of the minute the rollup covers, so a session's rate
+is its blinks over its real duration, not over whole minutes.
+
+Each batch is written in one transaction: events with executemany, minute
+rows upserted, then the session's row recomputed from its own minutes.
+History views read only the `sessions` and `session_minutes` aggregates,
+so they never scan raw events.
+
+Benchmark ingest and queries on synthetic sessions:
+    python blink_history.py
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = ".cache/blink_history.sqlite3"
+MAX_EVENTS_PER_BATCH = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blink_events (
+    session_id  TEXT NOT NULL,
+    t           REAL NOT NULL,
+    duration_ms REAL,
+    minute      INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blink_events_session ON blink_events (session_id);
+
+CREATE TABLE IF NOT EXISTS session_minutes (
+    session_id   TEXT    NOT NULL,
+    minute       INTEGER NOT NULL,
+    started_at   REAL    NOT NULL,
+    blinks       INTEGER NOT NULL,
+    blink_ms_sum REAL    NOT NULL DEFAULT 0,
+    blink_ms_n   INTEGER NOT NULL DEFAULT 0,
+    complete     INTEGER NOT NULL DEFAULT 0,
+    seconds      REAL    NOT NULL DEFAULT 60,
+    PRIMARY KEY (session_id, minute)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id   TEXT PRIMARY KEY,
+    source       TEXT,
+    started_at   REAL NOT NULL,
+    last_seen    REAL NOT NULL,
+    minutes      INTEGER NOT NULL,
+    blinks       INTEGER NOT NULL,
+    blink_ms_sum REAL    NOT NULL,
+    blink_ms_n   INTEGER NOT NULL,
+    min_blinks   INTEGER,
+    max_blinks   INTEGER,
+    seconds      REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_started ON sessions (started_at);
+"""
+
+_UPSERT_MINUTE = """
+INSERT INTO session_minutes (session_id, minute, started_at, blinks, blink_ms_sum, blink_ms_n, complete, seconds)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (session_id, minute) DO UPDATE SET
+    blinks       = excluded.blinks,
+    blink_ms_sum = blink_ms_sum + excluded.blink_ms_sum,
+    blink_ms_n   = blink_ms_n + excluded.blink_ms_n,
+    complete     = MAX(complete, excluded.complete),
+    seconds      = MAX(seconds, excluded.seconds)
+"""
+
+# Columns added after the first release, for databases created before them
+_ADDED_COLUMNS = [
+    ("session_minutes", "seconds", "REAL NOT NULL DEFAULT 60"),
+    ("sessions", "seconds", "REAL"),
+]
+
+# min/max blinks per minute only count full minutes
+_REFRESH_SESSION = """
+INSERT INTO sessions (session_id, source, started_at, last_seen, minutes, blinks,
+                      blink_ms_sum, blink_ms_n, min_blinks, max_blinks, seconds)
+SELECT session_id, ?, MIN(started_at), ?, COUNT(*), SUM(blinks), SUM(blink_ms_sum), SUM(blink_ms_n),
+       MIN(CASE WHEN complete THEN blinks END), MAX(CASE WHEN complete THEN blinks END), SUM(seconds)
+FROM session_minutes WHERE session_id = ?
+GROUP BY session_id
+ON CONFLICT (session_id) DO UPDATE SET
+    last_seen    = excluded.last_seen,
+    minutes      = excluded.minutes,
+    blinks       = excluded.blinks,
+    blink_ms_sum = excluded.blink_ms_sum,
+    blink_ms_n   = excluded.blink_ms_n,
+    min_blinks   = excluded.min_blinks,
+    max_blinks   = excluded.max_blinks,
+    seconds      = excluded.seconds
+"""
+
+
+class BlinkHistory:
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # One connection shared by all sessions, serialized by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        for table, column, decl in _ADDED_COLUMNS:
+            if column not in {r["name"] for r in self._conn.execute(f"PRAGMA table_info({table})")}:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+        self._lock = threading.Lock()
+        self.batches = 0
+
+    def ingest(self, batch: dict) -> int:
+        """Store one batch from the monitor. Returns the number of events written."""
+        session_id = str(batch.get("session_id") or "")
+        if not session_id:
+            raise ValueError("Blink batch has no session_id")
+        events = batch.get("events") or []
+        minutes = batch.get("minutes") or []
+        if len(events) > MAX_EVENTS_PER_BATCH:
+            raise ValueError(f"Blink batch has too many events ({len(events)})")
+
+        event_rows = []
+        durations: dict[int, list[float]] = {}
+        for e in events:
+            minute = int(e.get("minute", 0))
+            duration = e.get("duration_ms")
+            duration = None if duration is None else float(duration)
+            event_rows.append((session_id, float(e["t"]), duration, minute))
+            if duration is not None:
+                durations.setdefault(minute, []).append(duration)
+
+        now = time.time()
+        started_at = float(batch.get("started_at") or now)
+
+        def covered(minute_start: float, complete: bool, seconds=None) -> float:
+            # Older clients don't send seconds: a partial minute counts up to now
+            if seconds is not None:
+                return min(60.0, max(0.0, float(seconds)))
+            return 60.0 if complete else min(60.0, max(1.0, now - minute_start))
+
+        minute_rows = {}
+        for m in minutes:
+            minute = int(m["minute"])
+            minute_start = float(m.get("started_at") or started_at + 60 * minute)
+            complete = bool(m.get("complete"))
+            minute_rows[minute] = [
+                session_id, minute, minute_start, int(m["blinks"]), 0.0, 0, int(complete),
+                covered(minute_start, complete, m.get("seconds")),
+            ]
+        # Event durations are added to their minute even if no rollup came with them
+        for minute, values in durations.items():
+            minute_start = started_at + 60 * minute
+            row = minute_rows.setdefault(
+                minute, [session_id, minute, minute_start, len(values), 0.0, 0, 0, covered(minute_start, False)]
+            )
+            row[4] += sum(values)
+            row[5] += len(values)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT INTO blink_events VALUES (?, ?, ?, ?)", event_rows)
+                self._conn.executemany(_UPSERT_MINUTE, [tuple(r) for r in minute_rows.values()])
+                if minute_rows:
+                    self._conn.execute(_REFRESH_SESSION, (batch.get("source"), now, session_id))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.batches += 1
+        return len(event_rows)
+
+    def _query(self, sql: str, params=()) -> list[dict]:
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params)]
+
+    def recent_sessions(self, limit: int = 20) -> list[dict]:
+        return self._query(
+            """
+            SELECT session_id, source, started_at, minutes, blinks,
+                   ROUND(blinks * 60.0 / COALESCE(NULLIF(seconds, 0), minutes * 60), 1) AS blinks_per_minute,
+                   ROUND(blink_ms_sum / NULLIF(blink_ms_n, 0), 0) AS mean_blink_ms,
+                   min_blinks, max_blinks
+            FROM sessions ORDER BY started_at DESC LIMIT ?
+            """,
+            (limit,),
+        )
+
+    def daily_summary(self, days: int = 30) -> list[dict]:
+        return self._query(
+            """
+            SELECT date(started_at, 'unixepoch', 'localtime') AS day,
+                   COUNT(*) AS sessions, SUM(minutes) AS minutes, SUM(blinks) AS blinks,
+                   ROUND(SUM(blinks) * 60.0 / NULLIF(SUM(COALESCE(seconds, minutes * 60)), 0), 1) AS blinks_per_minute
+            FROM sessions WHERE started_at >= ?
+            GROUP BY day ORDER BY day
+            """,
+            (time.time() - days * 86400,),
+        )
+
+    def session_minutes(self, session_id: str) -> list[dict]:
+        return self._query(
+            "SELECT minute, started_at, blinks, complete FROM session_minutes WHERE session_id = ? ORDER BY minute",
+            (session_id,),
+        )
+
+    def stats(self) -> dict:
+        rows = self._query(
+            "SELECT (SELECT COUNT(*) FROM sessions) AS sessions, (SELECT COUNT(*) FROM blink_events) AS events"
+        )
+        return {**rows[0], "batches": self.batches}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ---------------------------
+# Benchmark
+# ---------------------------
+
+def benchmark(sessions: int = 2000, minutes: int = 5, path: str = ":memory:") -> dict:
+    import random
+
+    rng = random.Random(0)
+    history = BlinkHistory(path)
+    start = time.time() - 60 * 86400
+
+    t0 = time.perf_counter()
+    for s in range(sessions):
+        started = start + s * 2500
+        for minute in range(minutes):
+            blinks = rng.randint(5, 25)
+            history.ingest({
+                "session_id": f"bench-{s}",
+                "source": "bench",
+                "started_at": started,
+                "events": [
+                    {"t": started + 60 * minute + rng.random() * 60, "duration_ms": rng.uniform(100, 400), "minute": minute}
+                    for _ in range(blinks)
+                ],
+                "minutes": [{"minute": minute, "started_at": started + 60 * minute, "blinks": blinks, "complete": True}],
+            })
+    ingest_s = time.perf_counter() - t0
+
+    def timed(fn, *args):
+        t = time.perf_counter()
+        fn(*args)
+        return round((time.perf_counter() - t) * 1000, 2)
+
+    return {
+        **history.stats(),
+        "ingest_ms_per_batch": round(ingest_s * 1000 / history.batches, 3),
+        "recent_sessions_ms": timed(history.recent_sessions, 20),
+        "daily_summary_ms": timed(history.daily_summary, 90),
+        "session_minutes_ms": timed(history.session_minutes, f"bench-{sessions // 2}"),
+    }
+
+
+if __name__ == "__main__":
+    for key, value in benchmark().items():
+        print(f"{key:>22}: {value}")
@@ -0,0 +1,105 @@
+"""
+Map-reduce Gemini analysis for long frame sequences.
+
+The sequence is split into overlapping temporal windows, each window is
+analysed by its own generate_content call on a thread pool (the calls are
+I/O bound), and one short text-only call merges the per-window notes into
+the final report. A failed window is retried once and otherwise reported
+as a gap instead of failing the whole analysis.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from analysis_prompt import build_window_prompt, build_reduce_prompt
+from keyframes import Keyframe
+
+DEFAULT_WINDOW = 30
+DEFAULT_OVERLAP = 6
+DEFAULT_WORKERS = 4
+WINDOW_RETRIES = 1
+
+
+@dataclass
+class WindowResult:
+    first: int
+    last: int
+    text: str | None = None
+    error: str | None = None
+
+
+@dataclass
+class ChunkedResult:
+    text: str
+    windows: list[WindowResult] = field(default_factory=list)
+
+    @property
+    def failed(self) -> list[WindowResult]:
+        return [w for w in self.windows if w.error is not None]
+
+
+def plan_windows(frame_count: int, window: int = DEFAULT_WINDOW, overlap: int = DEFAULT_OVERLAP) -> list[range]:
+    """Overlapping [first, last] windows covering every frame; the last one is shifted back to stay full."""
+    if frame_count <= 0:
+        return []
+    window = max(1, min(window, frame_count))
+    step = max(1, window - max(0, overlap))
+
+    starts = list(range(0, max(1, frame_count - window + 1), step))
+    if starts[-1] + window < frame_count:
+        starts.append(frame_count - window)
+    return [range(s, s + window) for s in starts]
+
+
+def _analyze_window(model, frames, timestamps_ms, win: range, window_no: int, window_count: int) -> WindowResult:
+    result = WindowResult(first=win.start, last=win.stop - 1)
+    contents = [build_window_prompt(window_no, window_count, result.first, result.last, len(frames))]
+    for i in win:
+        contents.append(Keyframe(index=i, role=f"window {window_no}", time_ms=float(timestamps_ms[i])).label())
+        contents.append({"mime_type": "image/jpeg", "data": bytes(frames[i])})
+
+    for attempt in range(WINDOW_RETRIES + 1):
+        try:
+            result.text = model.generate_content(contents).text
+            result.error = None
+            break
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+def analyze_chunked(
+    model,
+    frames,
+    timestamps_ms,
+    country: str,
+    city: str,
+    age: int,
+    blink_stats: dict | None = None,
+    window: int = DEFAULT_WINDOW,
+    overlap: int = DEFAULT_OVERLAP,
+    max_workers: int = DEFAULT_WORKERS,
+) -> ChunkedResult:
+    windows = plan_windows(len(frames), window, overlap)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="gemini-window") as pool:
+        futures = [
+            pool.submit(_analyze_window, model, frames, timestamps_ms, win, n, len(windows))
+            for n, win in enumerate(windows, start=1)
+        ]
+        results = [f.result() for f in futures]
+
+    ok = [r for r in results if r.error is None]
+    if not ok:
+        raise RuntimeError(f"All {len(results)} analysis windows failed; last error: {results[-1].error}")
+
+    prompt = build_reduce_prompt(
+        [(r.first, r.last, r.text) for r in ok],
+        len(frames),
+        [(r.first, r.last) for r in results if r.error is not None],
+        country,
+        city,
+        age,
+        blink_stats,
+    )
+    return ChunkedResult(text=model.generate_content(prompt).text, windows=results)
@@ -0,0 +1,163 @@
+"""
+Pack consecutive frames into numbered grid images ("contact sheets").
+
+A 4x3 sheet carries twelve frames in one image part, so 120 frames go out
+as 10 parts instead of 120. Every tile is stamped with its frame number,
+and each sheet knows which frames it holds, so the model's observations can
+still be tied to frames and times.
+
+Tiles are decoded and resized one by one, then laid out with a single
+reshape / swapaxes over the whole stack, no per-tile pasting.
+
+Sheets and bytes for a capture:
+    python contact_sheet.py captured_frames.blnk --grid 5x4
+"""
+
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from blink_engine import decode_jpeg, frame_timestamps
+
+DEFAULT_COLS = 4
+DEFAULT_ROWS = 3
+DEFAULT_TILE_WIDTH = 320
+DEFAULT_QUALITY = 85
+
+
+@dataclass
+class ContactSheet:
+    number: int
+    data: bytes
+    frame_indices: list[int]
+    times_ms: list[float]
+    cols: int
+    rows: int
+
+    def label(self) -> str:
+        first, last = self.frame_indices[0], self.frame_indices[-1]
+        return (
+            f"Sheet {self.number}: frames {first}-{last} "
+            f"(t={self.times_ms[0]:.0f}-{self.times_ms[-1]:.0f} ms), "
+            f"{self.cols}x{self.rows} tiles left to right, top to bottom"
+        )
+
+    def part(self) -> dict:
+        return {"mime_type": "image/jpeg", "data": self.data}
+
+
+def _label_tile(tile: np.ndarray, text: str):
+    import cv2
+
+    scale = max(0.4, tile.shape[1] / 480)
+    (w, h), base = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 1)
+    cv2.rectangle(tile, (0, 0), (w + 6, h + base + 6), (0, 0, 0), thickness=-1)
+    cv2.putText(tile, text, (3, h + 3), cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), 1, cv2.LINE_AA)
+
+
+def tile_stack(frames, indices, tile_width: int = DEFAULT_TILE_WIDTH) -> np.ndarray:
+    """(n, h, w, 3) labelled tiles; frames that fail to decode become grey tiles."""
+    import cv2
+
+    tiles = None
+    for slot, i in enumerate(indices):
+        img = decode_jpeg(frames[i])
+        if tiles is None:
+            if img is None:
+                continue
+            tw = min(tile_width, img.shape[1])
+            th = max(1, round(img.shape[0] * tw / img.shape[1]))
+            tiles = np.full((len(indices), th, tw, 3), 96, dtype=np.uint8)
+        if img is not None:
+            th, tw = tiles.shape[1:3]
+            if img.shape[:2] != (th, tw):
+                img = cv2.resize(img, (tw, th), interpolation=cv2.INTER_AREA)
+            tiles[slot] = img
+    if tiles is None:
+        raise ValueError("no decodable frames for a contact sheet")
+    # Dark gutter on the right and bottom edge of every tile
+    tiles[:, -1], tiles[:, :, -1] = 0, 0
+    for slot, i in enumerate(indices):
+        _label_tile(tiles[slot], f"#{i}")
+    return tiles
+
+
+def pack_grid(tiles: np.ndarray, cols: int, rows: int) -> np.ndarray:
+    """(n, h, w, c) tiles -> (sheets, rows*h, cols*w, c), padded with black tiles."""
+    n, h, w, c = tiles.shape
+    per_sheet = cols * rows
+    sheets = -(-n // per_sheet)
+    if sheets * per_sheet != n:
+        tiles = np.concatenate([tiles, np.zeros((sheets * per_sheet - n, h, w, c), tiles.dtype)])
+    grid = tiles.reshape(sheets, rows, cols, h, w, c).swapaxes(2, 3)
+    return grid.reshape(sheets, rows * h, cols * w, c)
+
+
+def build_contact_sheets(
+    frames,
+    timestamps_ms=None,
+    cols: int = DEFAULT_COLS,
+    rows: int = DEFAULT_ROWS,
+    tile_width: int = DEFAULT_TILE_WIDTH,
+    quality: int = DEFAULT_QUALITY,
+) -> list[ContactSheet]:
+    """Every frame in order, cols * rows per sheet."""
+    from eye_crop import encode_jpeg
+
+    timestamps = frame_timestamps(len(frames), timestamps_ms)
+    indices = list(range(len(frames)))
+    tiles = tile_stack(frames, indices, tile_width)
+
+    # One sheet at a time, so only one sheet's worth of tiles is copied by the layout
+    per_sheet = cols * rows
+    sheets = []
+    for s in range(0, len(indices), per_sheet):
+        chunk = indices[s:s + per_sheet]
+        sheets.append(ContactSheet(
+            number=s // per_sheet + 1,
+            data=encode_jpeg(pack_grid(tiles[s:s + per_sheet], cols, rows)[0], quality),
+            frame_indices=chunk,
+            times_ms=[float(timestamps[i]) for i in chunk],
+            cols=cols,
+            rows=rows,
+        ))
+    return sheets
+
+
+def parse_grid(value: str) -> tuple[int, int]:
+    """"4x3" -> (4 columns, 3 rows)."""
+    cols, rows = (int(v) for v in value.lower().split("x"))
+    if cols < 1 or rows < 1:
+        raise ValueError(f"bad grid {value!r}")
+    return cols, rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from frame_container import load_capture
+
+    parser = argparse.ArgumentParser(description="Pack a capture into contact sheets and compare sizes.")
+    parser.add_argument("capture", help="captured_frames.blnk or .zip")
+    parser.add_argument("--grid", default=f"{DEFAULT_COLS}x{DEFAULT_ROWS}", help="columns x rows per sheet")
+    parser.add_argument("--tile-width", type=int, default=DEFAULT_TILE_WIDTH)
+    parser.add_argument("--save", metavar="PREFIX", help="write the sheets as PREFIX_01.jpg, ...")
+    args = parser.parse_args()
+
+    with open(args.capture, "rb") as f:
+        capture = load_capture(f.read())
+    cols, rows = parse_grid(args.grid)
+
+    t0 = time.perf_counter()
+    sheets = build_contact_sheets(capture.frames, capture.timestamps_ms, cols, rows, args.tile_width)
+    ms = (time.perf_counter() - t0) * 1000
+    images_kb = sum(len(memoryview(f)) for f in capture.frames) // 1024
+    sheets_kb = sum(len(s.data) for s in sheets) // 1024
+    print(f"{len(capture.frames)} frames -> {len(sheets)} sheets of {cols}x{rows} in {ms:.0f} ms")
+    print(f"{images_kb} KB as {len(capture.frames)} JPEG parts, {sheets_kb} KB as {len(sheets)} sheets")
+    for sheet in sheets:
+        print(f"  {sheet.label()}: {len(sheet.data) // 1024} KB")
+        if args.save:
+            with open(f"{args.save}_{sheet.number:02d}.jpg", "wb") as f:
+                f.write(sheet.data)
@@ -0,0 +1,167 @@
+"""
+Crop frames to a padded box around both eyes before upload.
+
+The box is computed once per sequence from the FaceMesh eye landmarks (the
+ones blink_engine already extracted, or a few sampled frames if those are
+not available), so it is stable across frames. Crops are re-encoded at a
+configurable width and JPEG quality.
+
+Benchmark on a capture:
+    python eye_crop.py captured_frames.blnk   (or a .zip of frames)
+"""
+
+import sys
+import threading
+import time
+
+import numpy as np
+
+from blink_engine import decode_jpeg, extract_eye_landmarks
+
+DEFAULT_PADDING = 0.35     # extra margin around the eyes, as a fraction of the box size
+DEFAULT_MAX_WIDTH = 320    # crops wider than this are downscaled
+DEFAULT_QUALITY = 80
+SAMPLE_FRAMES = 5          # frames to run FaceMesh on when no landmarks are passed in
+
+
+def eye_region_box(
+    landmarks: np.ndarray,
+    frame_size: tuple[int, int],
+    padding: float = DEFAULT_PADDING,
+) -> tuple[int, int, int, int] | None:
+    """(x0, y0, x1, y1) covering both eyes over the whole sequence, or None without a face."""
+    pts = landmarks.reshape(-1, 2)
+    pts = pts[~np.isnan(pts).any(axis=1)]
+    if pts.shape[0] == 0:
+        return None
+
+    # Percentiles rather than min/max so one bad landmark frame can't blow up the box
+    x0, y0 = np.percentile(pts, 2, axis=0)
+    x1, y1 = np.percentile(pts, 98, axis=0)
+    pad_x = (x1 - x0) * padding
+    pad_y = max(y1 - y0, (x1 - x0) * 0.25) * padding * 2
+
+    w, h = frame_size
+    box = (
+        int(max(0, np.floor(x0 - pad_x))),
+        int(max(0, np.floor(y0 - pad_y))),
+        int(min(w, np.ceil(x1 + pad_x))),
+        int(min(h, np.ceil(y1 + pad_y))),
+    )
+    if box[2] - box[0] < 2 or box[3] - box[1] < 2:
+        return None
+    return box
+
+
+def locate_eyes(frames, padding: float = DEFAULT_PADDING) -> tuple[int, int, int, int] | None:
+    """Run FaceMesh on a few evenly spaced frames and return the eye box."""
+    if len(frames) == 0:
+        return None
+    picks = np.unique(np.linspace(0, len(frames) - 1, min(SAMPLE_FRAMES, len(frames))).round().astype(int))
+    landmarks, frame_size = extract_eye_landmarks(decode_jpeg(frames[i]) for i in picks)
+    if frame_size is None:
+        return None
+    return eye_region_box(landmarks, frame_size, padding)
+
+
+def crop_image(img: np.ndarray, box, max_width: int = DEFAULT_MAX_WIDTH) -> np.ndarray:
+    import cv2
+
+    x0, y0, x1, y1 = box
+    crop = img[y0:y1, x0:x1]
+    if crop.shape[1] > max_width:
+        scale = max_width / crop.shape[1]
+        crop = cv2.resize(crop, (max_width, max(1, round(crop.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+    return crop
+
+
+def encode_jpeg(img: np.ndarray, quality: int = DEFAULT_QUALITY) -> bytes:
+    import cv2
+
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buf.tobytes()
+
+
+class EyeCropper:
+    """
+    Frame sequence view that crops on access.
+    Only the frames actually sent are decoded and re-encoded; results are memoized.
+    Frames that fail to decode are passed through unchanged.
+    Safe to share between threads (chunked analysis): each frame is cropped once.
+    """
+
+    def __init__(self, frames, box, max_width: int = DEFAULT_MAX_WIDTH, quality: int = DEFAULT_QUALITY):
+        self.frames = frames
+        self.box = box
+        self.max_width = max_width
+        self.quality = quality
+        self._cache: dict[int, bytes] = {}
+        self._frame_locks = [threading.Lock() for _ in range(len(frames))]
+        self._lock = threading.Lock()   # counters
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, i: int) -> bytes:
+        if i < 0:
+            i += len(self)
+        data = self._cache.get(i)
+        if data is not None:
+            return data
+        # Other frames are cropped in parallel; a second caller for this one waits for it
+        with self._frame_locks[i]:
+            if i not in self._cache:
+                t0 = time.perf_counter()
+                original = self.frames[i]
+                img = decode_jpeg(original)
+                data = bytes(original) if img is None else encode_jpeg(crop_image(img, self.box, self.max_width), self.quality)
+                with self._lock:
+                    self.seconds += time.perf_counter() - t0
+                    self.bytes_in += len(original)
+                    self.bytes_out += len(data)
+                    self._cache[i] = data
+        return self._cache[i]
+
+    def stats(self) -> dict:
+        with self._lock:
+            n = len(self._cache)
+            bytes_in, bytes_out, seconds = self.bytes_in, self.bytes_out, self.seconds
+        return {
+            "frames": n,
+            "bytes_before": bytes_in,
+            "bytes_after": bytes_out,
+            "ratio": round(bytes_in / bytes_out, 1) if bytes_out else None,
+            "ms_per_frame": round(seconds * 1000 / n, 2) if n else None,
+        }
+
+
+def benchmark_crop(frames, max_width: int = DEFAULT_MAX_WIDTH, quality: int = DEFAULT_QUALITY) -> dict:
+    """Locate the eyes and crop every frame; report bytes before/after and time per frame."""
+    t0 = time.perf_counter()
+    box = locate_eyes(frames)
+    locate_ms = (time.perf_counter() - t0) * 1000
+    if box is None:
+        return {"frames": len(frames), "box": None, "locate_ms": round(locate_ms, 1)}
+
+    cropper = EyeCropper(frames, box, max_width, quality)
+    for i in range(len(frames)):
+        cropper[i]
+    return {"box": box, "locate_ms": round(locate_ms, 1), **cropper.stats()}
+
+
+if __name__ == "__main__":
+    from frame_container import load_capture
+
+    if len(sys.argv) != 2:
+        sys.exit("usage: python eye_crop.py captured_frames.blnk|captured_frames.zip")
+
+    with open(sys.argv[1], "rb") as f:
+        frames = load_capture(f.read()).frames
+
+    for key, value in benchmark_crop(frames).items():
+        print(f"{key:>14}: {value}")
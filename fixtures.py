@@ -0,0 +1,32 @@
+"""
+Synthetic captures shared by the benchmarks and the load harness
+(bench_suite.py, load_harness.py, frame_container.py's format benchmark).
+Seeded, so every run sees the same bytes.
+"""
+
+import io
+import zipfile
+
+import numpy as np
+
+
+def synthetic_frames(n: int = 120, size=(480, 640), seed: int = 0) -> list[bytes]:
+    """Camera-like JPEGs: a blurred noise background with per-frame sensor noise."""
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    base = cv2.GaussianBlur(rng.integers(0, 255, (*size, 3), dtype=np.uint8), (0, 0), 3)
+    frames = []
+    for _ in range(n):
+        noise = rng.integers(0, 12, base.shape, dtype=np.uint8)
+        frames.append(cv2.imencode(".jpg", cv2.add(base, noise), [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes())
+    return frames
+
+
+def zip_frames(frames, compression: int = zipfile.ZIP_DEFLATED) -> bytes:
+    """The frames as the .zip upload the page used to get: frame_000.jpg, frame_001.jpg, ..."""
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", compression) as zf:
+        for i, f in enumerate(frames):
+            zf.writestr(f"frame_{i:03d}.jpg", f)
+    return out.getvalue()
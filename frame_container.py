@@ -0,0 +1,182 @@
+"""
+Capture upload formats.
+
+The capture component uploads a simple length-prefixed container instead
+of a ZIP, so the browser never recompresses or checksums the JPEGs:
+
+    offset  size        field
+    0       4           magic b"BLNK"
+    4       2           version (1)
+    6       2           reserved (0)
+    8       4           frame count n
+    12      4           metadata length m
+    16      8 * n       capture timestamps, float64 ms
+    16+8n   4 * n       frame lengths, uint32
+    16+12n  m           metadata, UTF-8 JSON
+    ...                 JPEG frames back to back
+
+All integers little-endian. The capture page's metadata has width, height,
+quality, source, skipped, stop_reason and blinks: the complete blinks its
+in-browser detector saw, as first closed / first reopened frame index and
+time ({"start", "end", "start_ms", "end_ms"}). Parsing slices the uploaded buffer, no frame is
+copied. ZIPs of frame_XXX.jpg files are still accepted; STORE entries are
+sliced without copying too.
+
+Benchmark against the ZIP path:
+    python frame_container.py
+"""
+
+import hashlib
+import io
+import json
+import struct
+import time
+import zipfile
+from dataclasses import dataclass, field
+
+import numpy as np
+
+MAGIC = b"BLNK"
+VERSION = 1
+EXTENSION = "blnk"
+_HEADER = struct.Struct("<4sHHII")
+_ZIP_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+
+
+@dataclass
+class Capture:
+    frames: list                        # memoryviews (or bytes) of the JPEG frames
+    timestamps_ms: np.ndarray | None = None
+    meta: dict = field(default_factory=dict)
+
+
+def pack_frames(frames, timestamps_ms=None, meta: dict | None = None) -> bytes:
+    """Build a container (the browser does the same in JavaScript)."""
+    frames = [memoryview(f) for f in frames]
+    n = len(frames)
+    if timestamps_ms is None:
+        timestamps_ms = np.zeros(n)
+    meta_bytes = json.dumps(meta or {}).encode("utf-8")
+
+    out = io.BytesIO()
+    out.write(_HEADER.pack(MAGIC, VERSION, 0, n, len(meta_bytes)))
+    out.write(np.asarray(timestamps_ms, dtype="<f8").tobytes())
+    out.write(np.array([f.nbytes for f in frames], dtype="<u4").tobytes())
+    out.write(meta_bytes)
+    for f in frames:
+        out.write(f)
+    return out.getvalue()
+
+
+def parse_container(buf) -> Capture:
+    view = memoryview(buf).cast("B")
+    if view.nbytes < _HEADER.size:
+        raise ValueError("Upload is too small to be a frame container")
+
+    magic, version, _, n, meta_len = _HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a frame container")
+    if version != VERSION:
+        raise ValueError(f"Unsupported frame container version {version}")
+
+    ts_off = _HEADER.size
+    len_off = ts_off + 8 * n
+    meta_off = len_off + 4 * n
+    data_off = meta_off + meta_len
+    if data_off > view.nbytes:
+        raise ValueError("Frame container header is truncated")
+
+    timestamps = np.frombuffer(view, dtype="<f8", count=n, offset=ts_off)
+    lengths = np.frombuffer(view, dtype="<u4", count=n, offset=len_off).astype(np.int64)
+    meta = json.loads(bytes(view[meta_off:data_off]).decode("utf-8")) if meta_len else {}
+
+    ends = data_off + np.cumsum(lengths)
+    if n and ends[-1] > view.nbytes:
+        raise ValueError("Frame container is truncated")
+    starts = ends - lengths
+    frames = [view[s:e] for s, e in zip(starts.tolist(), ends.tolist())]
+
+    return Capture(frames=frames, timestamps_ms=timestamps, meta=meta)
+
+
+def parse_zip(buf) -> Capture:
+    view = memoryview(buf).cast("B")
+    frames = []
+    with zipfile.ZipFile(io.BytesIO(view)) as zf:
+        names = sorted(n for n in zf.namelist() if n.endswith(".jpg"))
+        for name in names:
+            info = zf.getinfo(name)
+            if info.compress_type == zipfile.ZIP_STORED:
+                # Local header is 30 bytes + name + extra; the data follows uncompressed
+                fields = _ZIP_LOCAL_HEADER.unpack_from(view, info.header_offset)
+                start = info.header_offset + _ZIP_LOCAL_HEADER.size + fields[-2] + fields[-1]
+                frames.append(view[start:start + info.file_size])
+            else:
+                frames.append(zf.read(name))
+    return Capture(frames=frames)
+
+
+def capture_fingerprint(buf) -> str:
+    """Content hash of an upload; the same capture always maps to the same frame store."""
+    return hashlib.blake2b(memoryview(buf), digest_size=16).hexdigest()
+
+
+def load_capture(buf) -> Capture:
+    """Parse an uploaded capture, container or ZIP, from any buffer."""
+    head = bytes(memoryview(buf)[:4])
+    if head == MAGIC:
+        return parse_container(buf)
+    if head.startswith(b"PK"):
+        return parse_zip(buf)
+    raise ValueError("Unrecognised capture upload (expected a .blnk container or a .zip of frames)")
+
+
+# ---------------------------
+# Benchmark
+# ---------------------------
+
+def _old_zip_path(buf) -> list[bytes]:
+    # What the page did before: open every entry and read it into a list
+    with zipfile.ZipFile(io.BytesIO(buf), "r") as zip_ref:
+        frame_files = sorted([f for f in zip_ref.namelist() if f.endswith(".jpg")])
+        frames_bytes = []
+        for frame_file in frame_files:
+            with zip_ref.open(frame_file) as f:
+                frames_bytes.append(f.read())
+    return frames_bytes
+
+
+def benchmark(frames=None, repeat: int = 20) -> dict:
+    from fixtures import synthetic_frames, zip_frames
+
+    frames = frames or synthetic_frames()
+    timestamps = np.arange(len(frames)) * 33.3
+
+    def timed(fn, *args):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn(*args)
+            best = min(best, time.perf_counter() - t0)
+        return round(best * 1000, 3)
+
+    deflated = zip_frames(frames, zipfile.ZIP_DEFLATED)
+    stored = zip_frames(frames, zipfile.ZIP_STORED)
+    container = pack_frames(frames, timestamps)
+
+    return {
+        "frames": len(frames),
+        "jpeg_bytes": sum(len(f) for f in frames),
+        "zip_deflate": {"bytes": len(deflated), "pack_ms": timed(zip_frames, frames, zipfile.ZIP_DEFLATED), "parse_ms": timed(_old_zip_path, deflated)},
+        "zip_store": {"bytes": len(stored), "pack_ms": timed(zip_frames, frames, zipfile.ZIP_STORED), "parse_ms": timed(parse_zip, stored)},
+        "container": {"bytes": len(container), "pack_ms": timed(pack_frames, frames, timestamps), "parse_ms": timed(parse_container, container)},
+    }
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"{result['frames']} frames, {result['jpeg_bytes'] / 1024:.0f} KB of JPEG")
+    print(f"{'format':<14}{'KB':>10}{'pack ms':>10}{'parse ms':>10}")
+    for name in ("zip_deflate", "zip_store", "container"):
+        row = result[name]
+        print(f"{name:<14}{row['bytes'] / 1024:>10.0f}{row['pack_ms']:>10}{row['parse_ms']:>10}")
@@ -0,0 +1,164 @@
+"""
+Disk-backed storage for captured frames.
+
+Frames are appended to an anonymous spool file and read back through a
+read-only memory map, so session_state only has to hold a small store id.
+Frames are handed out as zero-copy memoryviews; convert with bytes() only
+at boundaries that need real bytes (st.image, Gemini parts).
+
+A store's file and map are released when the last reference to it goes
+away (or on close()), so a store dropped from the registry stays readable
+for any analysis that is still using it.
+"""
+
+import mmap
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Iterable, Iterator
+
+import numpy as np
+
+DEFAULT_TTL_S = 15 * 60
+DEFAULT_MAX_STORES = 32
+
+
+class FrameStore:
+    def __init__(self, frames: Iterable, spool_dir: str | None = None, timestamps_ms=None, meta: dict | None = None):
+        # TemporaryFile is unlinked immediately; the OS reclaims it on close
+        self._file = tempfile.TemporaryFile(prefix="frames_", dir=spool_dir)
+
+        offsets = [0]
+        for frame in frames:
+            self._file.write(frame)
+            offsets.append(offsets[-1] + len(memoryview(frame)))
+        self._file.flush()
+
+        # offsets[i]:offsets[i + 1] is frame i
+        self._offsets = np.asarray(offsets, dtype=np.int64)
+        self._mmap = None
+        self._view = None
+        if self.nbytes > 0:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)
+        self._finalizer = weakref.finalize(self, _release, self._view, self._mmap, self._file)
+
+        # Capture timestamps (ms from the first frame) and metadata sent with the upload
+        self.timestamps_ms = None if timestamps_ms is None else np.array(timestamps_ms, dtype=np.float64)
+        self.meta = dict(meta or {})
+
+        self.created_at = time.monotonic()
+        self.last_access = self.created_at
+
+    def __len__(self) -> int:
+        return int(self._offsets.shape[0] - 1)
+
+    def __getitem__(self, i: int) -> memoryview:
+        if self._view is None:
+            raise IndexError("frame store is empty or closed")
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(f"frame {i} out of range ({n} frames)")
+        self.last_access = time.monotonic()
+        return self._view[self._offsets[i]:self._offsets[i + 1]]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._offsets[-1])
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def close(self):
+        """Release the file now; only for a store nobody else can be holding."""
+        self._view = None
+        self._mmap = None
+        self._finalizer()
+
+
+def _release(view, mm, file):
+    # Runs once, from close() or when the store is garbage collected
+    if view is not None:
+        view.release()
+    if mm is not None:
+        try:
+            mm.close()
+        except BufferError:
+            # A caller still holds a frame view; the map goes away with it
+            pass
+    file.close()
+
+
+class FrameStoreRegistry:
+    """
+    Process-wide map of store id -> FrameStore.
+    Stores idle for longer than `ttl_s` are dropped, and only the
+    `max_stores` most recently used stores are kept. Dropped stores are
+    not closed: a session still analysing one keeps it open until it lets go.
+    """
+
+    def __init__(self, ttl_s: float = DEFAULT_TTL_S, max_stores: int = DEFAULT_MAX_STORES):
+        self.ttl_s = ttl_s
+        self.max_stores = max_stores
+        self._stores: OrderedDict[str, FrameStore] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key: str, store: FrameStore):
+        with self._lock:
+            self._stores.pop(key, None)
+            self._stores[key] = store
+            self._evict_locked()
+
+    def setdefault(self, key: str, store: FrameStore) -> FrameStore:
+        """Register `store` unless `key` already has one; the caller's losing store is closed."""
+        with self._lock:
+            existing = self._stores.get(key)
+            if existing is None:
+                self._stores[key] = store
+                self._evict_locked()
+                return store
+            existing.last_access = time.monotonic()
+            self._stores.move_to_end(key)
+        if store is not existing:
+            store.close()
+        return existing
+
+    def get(self, key: str | None) -> FrameStore | None:
+        if key is None:
+            return None
+        with self._lock:
+            self._evict_locked()
+            store = self._stores.get(key)
+            if store is not None:
+                store.last_access = time.monotonic()
+                self._stores.move_to_end(key)
+            return store
+
+    def discard(self, key: str):
+        with self._lock:
+            self._stores.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "stores": len(self._stores),
+                "frames": sum(len(s) for s in self._stores.values()),
+                "bytes": sum(s.nbytes for s in self._stores.values()),
+            }
+
+    def _evict_locked(self):
+        now = time.monotonic()
+        expired = [k for k, s in self._stores.items() if now - s.last_access > self.ttl_s]
+        for k in expired:
+            del self._stores[k]
+        while len(self._stores) > self.max_stores:
+            self._stores.popitem(last=False)
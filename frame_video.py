@@ -0,0 +1,145 @@
+"""
+Encode a capture as one short video clip, uploaded as a single part.
+
+Consecutive webcam frames are nearly identical, so a clip is a fraction of
+the size of the same frames as separate JPEGs. Frames are decoded, trimmed
+to even dimensions (4:2:0 needs them) and encoded with av at the capture's
+real frame rate; every frame keeps its capture time as its presentation
+time, so times in the clip are times in the capture.
+
+Size and encode time against the per-image upload, on a capture:
+    python frame_video.py captured_frames.blnk --codec vp9   (or a .zip of frames)
+"""
+
+import io
+import time
+from dataclasses import dataclass
+from fractions import Fraction
+
+import numpy as np
+
+from blink_engine import decode_jpeg, frame_timestamps
+
+# codec name -> (av encoder, container format, MIME type, encoder options)
+CODECS = {
+    "h264": ("libx264", "mp4", "video/mp4", {"preset": "ultrafast", "crf": "28"}),
+    "vp9": ("libvpx-vp9", "webm", "video/webm", {"crf": "36", "b": "0", "deadline": "realtime", "cpu-used": "8"}),
+}
+DEFAULT_CODEC = "h264"
+TIME_BASE = Fraction(1, 1000)  # presentation times in ms
+
+
+@dataclass
+class VideoClip:
+    data: bytes
+    mime_type: str
+    codec: str
+    frames: int
+    width: int
+    height: int
+    fps: float
+    duration_s: float
+    encode_ms: float
+
+    def part(self) -> dict:
+        """The clip as a Gemini content part."""
+        return {"mime_type": self.mime_type, "data": self.data}
+
+
+def capture_fps(timestamps_ms: np.ndarray) -> float:
+    duration = float(timestamps_ms[-1] - timestamps_ms[0]) if len(timestamps_ms) > 1 else 0.0
+    return (len(timestamps_ms) - 1) * 1000 / duration if duration > 0 else 30.0
+
+
+def encode_clip(frames, timestamps_ms=None, codec: str = DEFAULT_CODEC) -> VideoClip:
+    """
+    One clip from a sequence of JPEG frames (FrameStore, EyeCropper, list of bytes).
+    Frames that fail to decode are left out; the frames around them keep their times.
+    """
+    import av
+    import cv2
+
+    encoder, container_format, mime_type, options = CODECS[codec]
+    t0 = time.perf_counter()
+    timestamps = frame_timestamps(len(frames), timestamps_ms)
+    fps = capture_fps(timestamps)
+
+    out = io.BytesIO()
+    written, last_pts, size = 0, -1, None
+    with av.open(out, "w", format=container_format) as container:
+        stream = None
+        for i in range(len(frames)):
+            img = decode_jpeg(frames[i])
+            if img is None:
+                continue
+            if stream is None:
+                size = (img.shape[1] & ~1, img.shape[0] & ~1)
+                stream = container.add_stream(encoder, rate=Fraction(fps).limit_denominator(1000), options=options)
+                stream.width, stream.height = size
+                stream.pix_fmt = "yuv420p"
+                stream.time_base = stream.codec_context.time_base = TIME_BASE
+            img = img[:size[1], :size[0]]
+            if (img.shape[1], img.shape[0]) != size:
+                img = cv2.resize(img, size)
+
+            frame = av.VideoFrame.from_ndarray(np.ascontiguousarray(img), format="bgr24")
+            # Strictly increasing, even if two capture times round to the same ms
+            frame.pts = last_pts = max(int(round(timestamps[i] - timestamps[0])), last_pts + 1)
+            frame.time_base = TIME_BASE
+            container.mux(stream.encode(frame))
+            written += 1
+        if stream is None:
+            raise ValueError("no decodable frames to encode")
+        container.mux(stream.encode())
+
+    return VideoClip(
+        data=out.getvalue(),
+        mime_type=mime_type,
+        codec=codec,
+        frames=written,
+        width=size[0],
+        height=size[1],
+        fps=round(fps, 2),
+        duration_s=round(float(timestamps[-1] - timestamps[0]) / 1000, 2),
+        encode_ms=round((time.perf_counter() - t0) * 1000, 1),
+    )
+
+
+def compare_upload(frames, timestamps_ms=None, codecs=tuple(CODECS)) -> dict:
+    """Bytes and encode time of each codec next to the per-image upload of the same frames."""
+    result = {"frames": len(frames), "images_bytes": sum(len(memoryview(frames[i])) for i in range(len(frames)))}
+    for codec in codecs:
+        clip = encode_clip(frames, timestamps_ms, codec)
+        result[codec] = {
+            "bytes": len(clip.data),
+            "ratio": round(result["images_bytes"] / len(clip.data), 1),
+            "encode_ms": clip.encode_ms,
+            "fps": clip.fps,
+        }
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from frame_container import load_capture
+
+    parser = argparse.ArgumentParser(description="Compare a capture as one clip against separate JPEGs.")
+    parser.add_argument("capture", help="captured_frames.blnk or .zip")
+    parser.add_argument("--codec", choices=list(CODECS), action="append", help="default: all")
+    parser.add_argument("--save", metavar="PATH", help="also write the first codec's clip here")
+    args = parser.parse_args()
+
+    with open(args.capture, "rb") as f:
+        capture = load_capture(f.read())
+    codecs = args.codec or list(CODECS)
+
+    report = compare_upload(capture.frames, capture.timestamps_ms, codecs)
+    print(f"{report['frames']} frames, {report['images_bytes'] // 1024} KB as JPEG parts")
+    for codec in codecs:
+        row = report[codec]
+        print(f"{codec:>6}: {row['bytes'] // 1024} KB ({row['ratio']}x smaller), "
+              f"encoded in {row['encode_ms']} ms at {row['fps']} fps")
+    if args.save:
+        with open(args.save, "wb") as f:
+            f.write(encode_clip(capture.frames, capture.timestamps_ms, codecs[0]).data)
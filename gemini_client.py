@@ -0,0 +1,140 @@
+"""
+Shared Gemini client (the pages hold one per process with st.cache_resource).
+
+genai.configure() runs once per process and model objects are reused across
+sessions and reruns, so the underlying transport keeps its connections warm.
+The model name and generation config are set here and nowhere else; the
+page passes in its GEMINI_MODEL / GEMINI_API_ENDPOINT settings.
+Every call goes through GeminiClient.generate_content (or stream_content,
+which yields text as it is generated), counting in-flight requests so
+contention is visible under load.
+An endpoint points the client at another host over REST, e.g. the local
+mock in mock_gemini_server.py.
+"""
+
+import threading
+import time
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# Passed to every GenerativeModel; empty means the API defaults
+GENERATION_CONFIG: dict = {}
+
+
+class GeminiClient:
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = DEFAULT_MODEL,
+        generation_config: dict | None = None,
+        endpoint: str | None = None,
+    ):
+        self.api_key = api_key
+        self.model_name = model_name or DEFAULT_MODEL
+        self.endpoint = endpoint or None
+        self.generation_config = dict(GENERATION_CONFIG if generation_config is None else generation_config)
+
+        self._lock = threading.Lock()
+        self._model = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+
+                if self.endpoint:
+                    genai.configure(
+                        api_key=self.api_key,
+                        transport="rest",
+                        client_options={"api_endpoint": self.endpoint},
+                    )
+                else:
+                    genai.configure(api_key=self.api_key)
+                self._model = genai.GenerativeModel(
+                    self.model_name,
+                    generation_config=self.generation_config or None,
+                )
+            return self._model
+
+    def _begin(self):
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _end(self, failed: bool):
+        with self._lock:
+            self.in_flight -= 1
+            self.errors += failed
+
+    def generate_content(self, contents, **kwargs):
+        model = self.model
+        self._begin()
+        failed = True
+        try:
+            response = model.generate_content(contents, **kwargs)
+            failed = False
+            return response
+        finally:
+            self._end(failed)
+
+    def stream_content(self, contents, **kwargs) -> "TextStream":
+        """Streamed generate_content; iterate the result for text chunks."""
+        return TextStream(self, contents, kwargs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "model": self.model_name,
+                "endpoint": self.endpoint,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "requests": self.requests,
+                "errors": self.errors,
+            }
+
+
+class TextStream:
+    """
+    Text chunks of one streamed response, in arrival order.
+
+    The request is sent when iteration starts and counts as in flight until
+    the last chunk. Afterwards .text holds the whole response, .ttft_ms the
+    time to the first chunk and .total_ms the time to the last.
+    """
+
+    def __init__(self, client: GeminiClient, contents, kwargs: dict):
+        self._client = client
+        self._contents = contents
+        self._kwargs = kwargs
+        self.text = ""
+        self.chunks = 0
+        self.ttft_ms: float | None = None
+        self.total_ms: float | None = None
+
+    def __iter__(self):
+        client = self._client
+        model = client.model
+        client._begin()
+        failed = True
+        t0 = time.perf_counter()
+        try:
+            for chunk in model.generate_content(self._contents, stream=True, **self._kwargs):
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue   # no text parts, e.g. a final chunk with only the finish reason
+                if self.ttft_ms is None:
+                    self.ttft_ms = round((time.perf_counter() - t0) * 1000, 1)
+                self.text += text
+                self.chunks += 1
+                yield text
+            failed = False
+        finally:
+            self.total_ms = round((time.perf_counter() - t0) * 1000, 1)
+            client._end(failed)
@@ -0,0 +1,98 @@
+"""
+Pick the few frames worth sending to Gemini.
+
+Uses the eye-openness signal from blink_engine: for every blink the onset,
+trough and reopen frames, plus a few open-eye baseline frames. Remaining
+slots up to the cap are filled with evenly spaced frames so the model still
+sees the whole sequence.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from blink_engine import BlinkAnalysis, frame_timestamps
+
+DEFAULT_MAX_FRAMES = 16
+DEFAULT_BASELINE_FRAMES = 3
+MIN_BLINK_GAP = 3  # baseline frames stay at least this far from any blink
+
+
+@dataclass
+class Keyframe:
+    index: int
+    role: str
+    time_ms: float
+
+    def label(self) -> str:
+        return f"Frame {self.index} (t={self.time_ms:.0f} ms, {self.role})"
+
+
+def _baseline_candidates(analysis: BlinkAnalysis, count: int) -> list[int]:
+    """Widest-open frames, one per equal slice of the sequence, away from blinks."""
+    n = analysis.frame_count
+    ear = analysis.ear.copy()
+
+    near_blink = np.zeros(n, dtype=bool)
+    for e in analysis.events:
+        near_blink[max(0, e.start - MIN_BLINK_GAP):min(n, e.end + MIN_BLINK_GAP)] = True
+    ear[near_blink] = np.nan
+
+    picks = []
+    for chunk in np.array_split(np.arange(n), count):
+        if chunk.size == 0 or np.all(np.isnan(ear[chunk])):
+            continue
+        picks.append(int(chunk[np.nanargmax(ear[chunk])]))
+    return picks
+
+
+def select_keyframes(
+    analysis: BlinkAnalysis | None,
+    frame_count: int,
+    max_frames: int = DEFAULT_MAX_FRAMES,
+    baseline_frames: int = DEFAULT_BASELINE_FRAMES,
+    timestamps_ms=None,
+) -> list[Keyframe]:
+    """
+    Return at most `max_frames` keyframes in time order.
+    Priority when the cap is tight: blink troughs, baseline frames,
+    blink onsets / reopens, then evenly spaced context frames.
+    """
+    max_frames = max(1, int(max_frames))
+    if analysis is not None and analysis.frame_count == frame_count:
+        ts = analysis.timestamps_ms
+    else:
+        analysis = None
+        ts = frame_timestamps(frame_count, timestamps_ms)
+
+    chosen: dict[int, str] = {}
+
+    def add(index: int, role: str):
+        if len(chosen) < max_frames and 0 <= index < frame_count and index not in chosen:
+            chosen[index] = role
+
+    if frame_count <= max_frames:
+        for i in range(frame_count):
+            add(i, "sequence")
+    else:
+        if analysis is not None:
+            for n, e in enumerate(analysis.events, start=1):
+                add(e.trough, f"blink {n} fully closed")
+            for i in _baseline_candidates(analysis, baseline_frames):
+                add(i, "eyes open baseline")
+            for n, e in enumerate(analysis.events, start=1):
+                add(e.start, f"blink {n} onset")
+                add(e.end, f"blink {n} reopened")
+
+        for i in np.linspace(0, frame_count - 1, max_frames).round().astype(int):
+            add(int(i), "context")
+
+        # linspace can collide with already chosen frames; top up from the gaps
+        if len(chosen) < max_frames:
+            for i in range(frame_count):
+                add(i, "context")
+
+    return [
+        Keyframe(index=i, role=chosen[i], time_ms=float(ts[i]))
+        for i in sorted(chosen)
+    ]
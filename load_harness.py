@@ -0,0 +1,273 @@
+"""
+Concurrent-session load test for the Blink Analysis pipeline.
+
+Simulates N users who each upload a 120-frame capture and click Analyze,
+running the page's own code in one process (as the Streamlit server would):
+the upload is decoded into the shared frame store by content, then
+analysis_pipeline.analyze() measures blinks, crops the eyes, builds the
+upload, calls Gemini and renders the PDF, with the page's settings plus the
+flags below. Gemini is the local mock (mock_gemini_server.py),
+started in-process unless --endpoint points at one already running.
+
+    python load_harness.py --sessions 50 --latency-ms 800 --ms-per-mb 150
+    python load_harness.py --sessions 20 --rounds 3 --mode chunked --error-rate 0.05 --json load.json
+    python load_harness.py --sessions 50 --stream --chunk-ms 40
+    python load_harness.py --sessions 20 --upload video      # vs. --all-frames: one clip instead of 120 JPEGs
+
+Reports throughput, end-to-end and per-stage latency percentiles, the mock's
+peak concurrency, time to first chunk with --stream, and process memory (RSS sampled during the run, plus the
+tracemalloc peak with --tracemalloc).
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+from perf_log import percentile
+
+RSS_SAMPLE_S = 0.05
+
+
+def rss_mb() -> float | None:
+    """Current resident set size (Linux /proc); None elsewhere."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler:
+    def __init__(self, interval_s: float = RSS_SAMPLE_S):
+        self.interval_s = interval_s
+        self.start_mb = rss_mb()
+        self.peak_mb = self.start_mb
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            now = rss_mb()
+            if now is not None and (self.peak_mb is None or now > self.peak_mb):
+                self.peak_mb = now
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.end_mb = rss_mb()
+        return False
+
+
+# ---------------------------
+# One simulated analysis
+# ---------------------------
+
+def run_analysis(session: int, round_no: int, upload: bytes, gemini, registry, cache, options, args) -> dict:
+    from analysis_pipeline import analysis_key, analyze
+    from frame_container import capture_fingerprint, load_capture
+    from frame_store import FrameStore
+    from profiler import RequestProfile
+
+    country, city, age = "Egypt", "Cairo", 18 + (session * args.rounds + round_no) % 80
+    result = {"session": session, "round": round_no}
+    try:
+        with RequestProfile("load", session=session, mode=options.mode) as profile:
+            # Keyed by content, as on the page: a later round reuses the decoded store
+            with profile.span("fingerprint", bytes=len(upload)) as span:
+                fingerprint = capture_fingerprint(upload)
+                frames = registry.get(fingerprint)
+                span["hit"] = frames is not None
+            if frames is None:
+                with profile.span("decode", bytes=len(upload)):
+                    capture = load_capture(upload)
+                    store = FrameStore(capture.frames, timestamps_ms=capture.timestamps_ms, meta=capture.meta)
+                    frames = registry.setdefault(fingerprint, store)
+
+            with profile.span("cache_lookup") as span:
+                key = analysis_key(frames, gemini, options, country, city, age)
+                cached = cache.get(key)
+                span["hit"] = cached is not None
+
+            if cached is None:
+                analysis = analyze(gemini, frames, country, city, age, options, profile)
+                result["upload_bytes"] = analysis.upload.payload_bytes
+                result["ttft_ms"] = analysis.ttft_ms
+                if analysis.complete:
+                    cache.put(key, analysis.text, analysis.pdf, analysis.blink_stats)
+
+        result["ok"] = True
+    except Exception as e:
+        result["ok"] = False
+        result["error"] = f"{type(e).__name__}: {e}"[:200]
+    result["total_ms"] = profile.total_ms
+    result["spans"] = {s["stage"]: s["ms"] for s in profile.spans}
+    return result
+
+
+# ---------------------------
+# Driver
+# ---------------------------
+
+def make_uploads(count: int, frames: int) -> list[bytes]:
+    """Distinct 120-frame ZIPs, as the capture page used to upload them."""
+    from fixtures import synthetic_frames, zip_frames
+
+    return [zip_frames(synthetic_frames(frames, seed=i)) for i in range(count)]
+
+
+def summarize_run(results: list[dict], wall_s: float) -> dict:
+    ok = [r for r in results if r["ok"]]
+    totals = [r["total_ms"] for r in ok]
+    stages: dict[str, list[float]] = {}
+    for r in ok:
+        for stage, ms in r["spans"].items():
+            stages.setdefault(stage, []).append(ms)
+
+    def pcts(values):
+        return {
+            "p50": round(percentile(values, 50), 1),
+            "p95": round(percentile(values, 95), 1),
+            "p99": round(percentile(values, 99), 1),
+            "max": round(max(values), 1) if values else None,
+        }
+
+    errors: dict[str, int] = {}
+    for r in results:
+        if not r["ok"]:
+            errors[r["error"].split(":")[0]] = errors.get(r["error"].split(":")[0], 0) + 1
+
+    return {
+        "analyses": len(results),
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "errors": errors,
+        "wall_s": round(wall_s, 2),
+        "throughput_per_min": round(len(ok) / wall_s * 60, 1) if wall_s else None,
+        "latency_ms": pcts(totals),
+        "stages_ms": {stage: pcts(v) for stage, v in sorted(stages.items())},
+        "upload_kb": pcts([r["upload_bytes"] / 1024 for r in ok if "upload_bytes" in r]),
+        "ttft_ms": pcts([r["ttft_ms"] for r in ok if r.get("ttft_ms") is not None]),
+    }
+
+
+def main(argv=None) -> int:
+    from mock_gemini_server import add_config_args, config_from_args
+
+    parser = argparse.ArgumentParser(description="Simulate concurrent Blink Analysis sessions against a mock Gemini.")
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent users")
+    parser.add_argument("--rounds", type=int, default=1, help="analyses per user, back to back")
+    parser.add_argument("--frames", type=int, default=120, help="frames per capture")
+    parser.add_argument("--mode", choices=["single", "chunked"], default="single")
+    parser.add_argument("--upload", choices=["images", "video", "contact_sheet"], default="images",
+                        help="single mode: JPEG parts, one video clip, or grid images of numbered frames")
+    parser.add_argument("--all-frames", action="store_true", help="images upload: send every frame, not just keyframes")
+    parser.add_argument("--stream", action="store_true", help="stream single-mode responses and build the PDF as they arrive")
+    parser.add_argument("--no-blinks", action="store_true", help="skip local blink measurement (FaceMesh)")
+    parser.add_argument("--endpoint", help="use a running mock / proxy instead of starting one")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report the Python allocation peak (slower)")
+    parser.add_argument("--json", help="write the report here")
+    add_config_args(parser)
+    args = parser.parse_args(argv)
+
+    # Keep load-test timings out of the real logs and cache
+    workdir = tempfile.mkdtemp(prefix="blink_load_")
+    os.environ.setdefault("PERF_LOG_DIR", os.path.join(workdir, "logs"))
+
+    from analysis_cache import AnalysisCache
+    from analysis_pipeline import AnalysisOptions
+    from frame_store import FrameStoreRegistry
+    from gemini_client import DEFAULT_MODEL, GeminiClient
+    from settings import get_setting
+
+    server = None
+    endpoint = args.endpoint
+    if endpoint is None:
+        from mock_gemini_server import start_server
+
+        server = start_server(config=config_from_args(args), backlog=args.sessions)
+        endpoint = server.endpoint
+
+    print(f"Preparing {args.sessions} captures of {args.frames} frames...", file=sys.stderr)
+    uploads = make_uploads(args.sessions, args.frames)
+
+    gemini = GeminiClient("load-test", get_setting("GEMINI_MODEL", DEFAULT_MODEL), endpoint=endpoint)
+    registry = FrameStoreRegistry()
+    cache = AnalysisCache(os.path.join(workdir, "cache"))
+
+    # The page's settings, with the analysis flags given here
+    options = replace(
+        AnalysisOptions.from_settings(),
+        mode=args.mode,
+        upload=args.upload,
+        selection="all" if args.all_frames else "keyframes",
+        stream=args.stream,
+        measure_blinks=not args.no_blinks,
+    )
+
+    def session(i: int) -> list[dict]:
+        return [run_analysis(i, r, uploads[i], gemini, registry, cache, options, args) for r in range(args.rounds)]
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    print(f"Running {args.sessions} sessions x {args.rounds} rounds against {endpoint}...", file=sys.stderr)
+    with RssSampler() as rss:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            results = [r for rs in pool.map(session, range(args.sessions)) for r in rs]
+        wall_s = time.perf_counter() - t0
+
+    report = summarize_run(results, wall_s)
+    report["memory_mb"] = {
+        "rss_start": None if rss.start_mb is None else round(rss.start_mb, 1),
+        "rss_peak": None if rss.peak_mb is None else round(rss.peak_mb, 1),
+        "rss_end": None if rss.end_mb is None else round(rss.end_mb, 1),
+    }
+    if args.tracemalloc:
+        report["memory_mb"]["tracemalloc_peak"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+        tracemalloc.stop()
+    report["gemini_client"] = gemini.stats()
+    if server is not None:
+        report["mock_server"] = server.stats.as_dict()
+        server.shutdown()
+
+    lat, mem = report["latency_ms"], report["memory_mb"]
+    print(f"\n{report['ok']}/{report['analyses']} analyses ok in {report['wall_s']} s "
+          f"-> {report['throughput_per_min']} analyses/min")
+    print(f"end-to-end ms: p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}  max {lat['max']}")
+    if report["upload_kb"]["max"] is not None:
+        print(f"upload KB per analysis: p50 {report['upload_kb']['p50']}  max {report['upload_kb']['max']}")
+    if report["ttft_ms"]["max"] is not None:
+        ttft = report["ttft_ms"]
+        print(f"first chunk ms: p50 {ttft['p50']}  p95 {ttft['p95']}  p99 {ttft['p99']}  max {ttft['max']}")
+    print(f"memory MB: rss start {mem['rss_start']}  peak {mem['rss_peak']}  end {mem['rss_end']}"
+          + (f"  tracemalloc peak {mem['tracemalloc_peak']}" if "tracemalloc_peak" in mem else ""))
+    if report["errors"]:
+        print(f"errors: {report['errors']}")
+    print(f"\n{'stage':<18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage, row in report["stages_ms"].items():
+        print(f"{stage:<18}{row['p50']:>10}{row['p95']:>10}{row['p99']:>10}{row['max']:>10}")
+    if "mock_server" in report:
+        print(f"\nmock server: {report['mock_server']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Country -> cities lookup for the location selectboxes.
+
+Built once from countries.csv with the csv module (no pandas), with every
+city list pre-sorted, and persisted as a small pickle next to the CSV so the
+next process start skips parsing. The pickle is rebuilt whenever the CSV's
+size or modification time changes.
+"""
+
+import csv
+import os
+import pickle
+from dataclasses import dataclass, field
+
+INDEX_VERSION = 1
+REQUIRED_COLUMNS = {"Country", "City"}
+
+
+@dataclass(frozen=True)
+class LocationIndex:
+    countries: tuple[str, ...] = ()
+    cities_by_country: dict[str, tuple[str, ...]] = field(default_factory=dict)
+
+    def cities(self, country: str | None) -> tuple[str, ...]:
+        if not country:
+            return ()
+        return self.cities_by_country.get(country, ())
+
+
+def index_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + ".idx"
+
+
+def build_index(csv_path: str) -> LocationIndex:
+    cities: dict[str, set[str]] = {}
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = REQUIRED_COLUMNS - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"countries.csv is missing columns: {missing}")
+
+        for row in reader:
+            country, city = row["Country"], row["City"]
+            if not country:
+                continue
+            bucket = cities.setdefault(country, set())
+            if city:
+                bucket.add(city)
+
+    return LocationIndex(
+        countries=tuple(sorted(cities)),
+        cities_by_country={c: tuple(sorted(names)) for c, names in cities.items()},
+    )
+
+
+def load_location_index(csv_path: str = "countries.csv", persist: bool = True) -> LocationIndex:
+    st = os.stat(csv_path)
+    stamp = (INDEX_VERSION, st.st_size, st.st_mtime_ns)
+    idx_path = index_path(csv_path)
+
+    try:
+        with open(idx_path, "rb") as f:
+            saved_stamp, countries, cities_by_country = pickle.load(f)
+        if saved_stamp == stamp:
+            return LocationIndex(countries, cities_by_country)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+        pass
+
+    index = build_index(csv_path)
+    if persist:
+        try:
+            tmp = idx_path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump((stamp, index.countries, index.cities_by_country), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, idx_path)
+        except OSError:
+            # Read-only deployment: keep the in-memory index only
+            pass
+    return index
@@ -0,0 +1,254 @@
+"""
+Local stand-in for the Gemini generateContent endpoint, for load tests.
+
+    python mock_gemini_server.py --port 8765 --latency-ms 800 --ms-per-mb 150 --error-rate 0.02
+
+Then point the app at it (the API key can be anything):
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8765
+
+Serves POST /v1beta/models/{model}:generateContent in the REST shape the
+google-generativeai client expects, after a delay of
+latency + jitter + ms_per_mb * request size, plus chunk_ms for each chunk
+of "generated" text. :streamGenerateContent sends the same text as a JSON
+array of chunks, the first after the base delay and then one every
+chunk_ms. A fraction of requests fails with one of the configured status
+codes. GET /stats returns counters.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+
+_PATH = re.compile(r"^/v1beta/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)$")
+CHUNK_WORDS = 8
+
+RESPONSE_MARKDOWN = """## Observations (mock)
+Received {images} image(s) and {kb} KB of request data for model `{model}`.
+
+| Finding | Detail |
+|---|---|
+| Blink completeness | Most blinks appear complete |
+| Eye redness | None visible |
+
+This is a canned response from mock_gemini_server.py.
+"""
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 800.0
+    jitter_ms: float = 200.0
+    ms_per_mb: float = 150.0          # extra delay per MB of request body (upload + processing)
+    chunk_ms: float = 30.0            # generation time per chunk of CHUNK_WORDS words
+    error_rate: float = 0.0
+    error_codes: tuple = (429, 500, 503)
+    seed: int | None = None
+
+
+@dataclass
+class MockStats:
+    requests: int = 0
+    streams: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    bytes_received: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "streams": self.streams,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "bytes_received": self.bytes_received,
+            }
+
+
+class MockGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: MockConfig, backlog: int | None = None):
+        # listen() backlog; the default of 5 refuses connections from a larger burst of clients
+        if backlog is not None:
+            self.request_queue_size = max(backlog, self.request_queue_size)
+        super().__init__(address, _Handler)
+        self.config = config
+        self.stats = MockStats()
+        self.rng = random.Random(config.seed)
+        self._rng_lock = threading.Lock()
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def draw(self) -> tuple[float, int | None]:
+        """Random jitter (ms) and the error status to return, if any."""
+        c = self.config
+        with self._rng_lock:
+            jitter = self.rng.uniform(-c.jitter_ms, c.jitter_ms) if c.jitter_ms else 0.0
+            error = self.rng.choice(c.error_codes) if self.rng.random() < c.error_rate else None
+        return jitter, error
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: MockGeminiServer
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, chunks: list[dict], chunk_ms: float):
+        """A JSON array written element by element (chunked transfer encoding)."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(chunk_ms / 1000)
+            piece = ("[" if i == 0 else ",\r\n") + json.dumps(chunk)
+            self._write_chunk(piece.encode("utf-8"))
+        self._write_chunk(b"]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.stats.as_dict())
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+    def do_POST(self):
+        match = _PATH.match(self.path.split("?", 1)[0])
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length)
+        if not match:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+            return
+
+        stats, config = self.server.stats, self.server.config
+        with stats.lock:
+            stats.requests += 1
+            stats.streams += match["method"] == "streamGenerateContent"
+            stats.in_flight += 1
+            stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+            stats.bytes_received += len(raw)
+        try:
+            jitter, error = self.server.draw()
+            delay_ms = config.latency_ms + jitter + config.ms_per_mb * len(raw) / (1024 * 1024)
+            time.sleep(max(0.0, delay_ms) / 1000)
+
+            if error is not None:
+                with stats.lock:
+                    stats.errors += 1
+                self._send_json(error, {"error": {"code": error, "message": "Injected error", "status": "UNAVAILABLE"}})
+                return
+
+            try:
+                request = json.loads(raw or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": {"code": 400, "message": "Invalid JSON", "status": "INVALID_ARGUMENT"}})
+                return
+            images = sum(
+                1
+                for content in request.get("contents", [])
+                for part in content.get("parts", [])
+                if "inlineData" in part or "inline_data" in part
+            )
+            text = RESPONSE_MARKDOWN.format(images=images, kb=len(raw) // 1024, model=match["model"])
+            words = text.split(" ")
+            pieces = [" ".join(words[i:i + CHUNK_WORDS]) + " " for i in range(0, len(words), CHUNK_WORDS)]
+            pieces[-1] = pieces[-1][:-1]
+            usage = {"promptTokenCount": images * 258, "candidatesTokenCount": 80, "totalTokenCount": images * 258 + 80}
+
+            if match["method"] == "streamGenerateContent":
+                chunks = [{"candidates": [{"content": {"parts": [{"text": p}], "role": "model"}, "index": 0}]} for p in pieces]
+                chunks[-1]["candidates"][0]["finishReason"] = "STOP"
+                chunks[-1]["usageMetadata"] = usage
+                self._send_stream(chunks, config.chunk_ms)
+                return
+
+            time.sleep(config.chunk_ms * (len(pieces) - 1) / 1000)
+            self._send_json(200, {
+                "candidates": [{
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": usage,
+            })
+        finally:
+            with stats.lock:
+                stats.in_flight -= 1
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, config: MockConfig | None = None,
+                 backlog: int | None = None) -> MockGeminiServer:
+    """Start the mock on a background thread (port 0 = any free port).
+    backlog should be at least the number of clients that may connect at once."""
+    server = MockGeminiServer((host, port), config or MockConfig(), backlog)
+    threading.Thread(target=server.serve_forever, name="mock-gemini", daemon=True).start()
+    return server
+
+
+def add_config_args(parser: argparse.ArgumentParser):
+    d = MockConfig()
+    parser.add_argument("--latency-ms", type=float, default=d.latency_ms, help="base response time")
+    parser.add_argument("--jitter-ms", type=float, default=d.jitter_ms, help="uniform +/- jitter on the base time")
+    parser.add_argument("--ms-per-mb", type=float, default=d.ms_per_mb, help="extra delay per MB of request")
+    parser.add_argument("--chunk-ms", type=float, default=d.chunk_ms, help="generation time per streamed chunk")
+    parser.add_argument("--error-rate", type=float, default=d.error_rate, help="fraction of requests that fail")
+    parser.add_argument("--error-codes", default=",".join(map(str, d.error_codes)), help="statuses used for failures")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args) -> MockConfig:
+    return MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        ms_per_mb=args.ms_per_mb,
+        chunk_ms=args.chunk_ms,
+        error_rate=args.error_rate,
+        error_codes=tuple(int(c) for c in args.error_codes.split(",")),
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Gemini generateContent server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--backlog", type=int, default=128, help="pending connections before new ones are refused")
+    add_config_args(parser)
+    args = parser.parse_args()
+
+    server = MockGeminiServer((args.host, args.port), config_from_args(args), args.backlog)
+    print(f"Mock Gemini listening on {server.endpoint} (set GEMINI_API_ENDPOINT to this)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats.as_dict()))
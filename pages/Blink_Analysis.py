@@ -1,16 +1,30 @@
-import io
-import re
+from perf_log import PageTimer
+
+timer = PageTimer("blink_analysis")
+
 import base64
+import json
 import streamlit as st
-import google.generativeai as genai
-import pandas as pd
 import os
-from reportlab.platypus import (
-    SimpleDocTemplate, Spacer, Table, TableStyle, Paragraph, Image as RLImage
+import numpy as np
+
+from frame_container import EXTENSION as CONTAINER_EXTENSION, capture_fingerprint, load_capture
+from frame_store import FrameStore, FrameStoreRegistry, DEFAULT_TTL_S, DEFAULT_MAX_STORES
+from analysis_cache import AnalysisCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_MB
+from analysis_pipeline import AnalysisHooks, AnalysisOptions, analysis_key, analyze
+from eye_crop import EyeCropper
+from location_index import LocationIndex, load_location_index
+from gemini_client import DEFAULT_MODEL, GeminiClient
+from assets import resized_jpeg
+from profiler import RequestProfile
+from settings import get_setting
+from vendor_assets import loader_js
+
+st.set_page_config(
+    page_title="Blink Analysis - Eye Health Check",
+    page_icon="👁️",
+    layout="wide"
 )
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
 
 # ---------------------------
 # Gemini setup
@@ -22,150 +36,111 @@ if not api_key:
     st.error("Missing GEMINI_API_KEY. Add it in Streamlit Secrets.")
     st.stop()
 
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel("gemini-2.5-flash")
+GEMINI_MODEL = get_setting("GEMINI_MODEL", DEFAULT_MODEL)
+GEMINI_API_ENDPOINT = get_setting("GEMINI_API_ENDPOINT")
+
+# Settings are read on every run and passed in, never inside a cached resource
+@st.cache_resource
+def get_gemini(api_key: str, model_name: str, endpoint: str | None):
+    # One client per process: configured once, shared by every session.
+    # google.generativeai itself is only imported on the first request.
+    return GeminiClient(api_key, model_name, endpoint=endpoint)
+
+gemini = get_gemini(api_key, GEMINI_MODEL, GEMINI_API_ENDPOINT)
+
+# Frame selection, analysis / upload mode, eye crops and streaming (see analysis_pipeline.py)
+ANALYSIS_OPTIONS = AnalysisOptions.from_settings()
+
+# Capture length: stop after this many complete blinks (seen in the browser) plus a
+# trailing margin, no earlier than CAPTURE_MIN_FRAMES. At CAPTURE_FRAMES it stops if any
+# blink was seen, else after the first one; CAPTURE_MAX_FRAMES is the hard cap.
+# 0 blinks = always CAPTURE_FRAMES.
+CAPTURE_TARGET_BLINKS = get_setting("CAPTURE_TARGET_BLINKS", 1, int)
+CAPTURE_FRAMES = get_setting("CAPTURE_FRAMES", 120, int)
+CAPTURE_MIN_FRAMES = get_setting("CAPTURE_MIN_FRAMES", 60, int)
+CAPTURE_MAX_FRAMES = get_setting("CAPTURE_MAX_FRAMES", 300, int)
+CAPTURE_TRAILING_MS = get_setting("CAPTURE_TRAILING_MS", 500, int)
+
+# Width of the first-frame preview (pre-rendered once per capture)
+PREVIEW_WIDTH = 480
+
+# Per-stage timings are always logged; this also shows them on the page
+SHOW_TIMINGS = get_setting("SHOW_TIMINGS", False, bool)
+
+# Captures shared by all sessions, and finished analyses on disk
+FRAME_STORE_TTL_S = get_setting("FRAME_STORE_TTL_S", DEFAULT_TTL_S, float)
+FRAME_STORE_MAX = get_setting("FRAME_STORE_MAX", DEFAULT_MAX_STORES, int)
+ANALYSIS_CACHE_DIR = get_setting("ANALYSIS_CACHE_DIR", DEFAULT_CACHE_DIR)
+ANALYSIS_CACHE_MAX_MB = get_setting("ANALYSIS_CACHE_MAX_MB", DEFAULT_MAX_MB, float)
 
 
 # ---------------------------
 # Data load
 # ---------------------------
 
-st.set_page_config(
-    page_title="Blink Analysis - Eye Health Check",
-    page_icon="👁️",
-    layout="wide"
-)
-
-@st.cache_data
+@st.cache_resource
 def load_data():
+    # Shared, read-only index: every rerun is a dict lookup, nothing is copied
     try:
-        df = pd.read_csv("countries.csv")
-        
-        # Now only expecting Country and City columns
-        expected = {"Country", "City"}
-        missing = expected - set(df.columns)
-        if missing:
-            st.error(f"countries.csv is missing columns: {missing}")
-            return pd.DataFrame(columns=["Country", "City"])
-
-        df["Country"] = df["Country"].astype(str)
-        df["City"] = df["City"].astype(str)
-
-        return df
+        return load_location_index("countries.csv")
 
     except FileNotFoundError:
         st.error("Error: 'countries.csv' file not found. Please check the path.")
-        return pd.DataFrame(columns=["Country", "City"])
+        return LocationIndex()
 
     except Exception as e:
         st.error(f"Failed to load countries.csv: {e}")
-        return pd.DataFrame(columns=["Country", "City"])
+        return LocationIndex()
 
-df = load_data()
+locations = load_data()
 
 def get_countries():
-    if not df.empty:
-        return sorted(df["Country"].dropna().unique().tolist())
-    return []
+    return locations.countries
 
 def get_cities(country: str):
-    if not df.empty and country:
-        return sorted(df[df["Country"] == country]["City"].dropna().unique().tolist())
-    return []
+    return locations.cities(country)
 
 # ---------------------------
-# PDF generation
+# Frame storage
 # ---------------------------
 
-def generate_pdf_from_text_and_image(text_content: str, image_bytes: bytes | None = None):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=letter,
-        rightMargin=72,
-        leftMargin=72,
-        topMargin=72,
-        bottomMargin=18
-    )
-    
-    styles = getSampleStyleSheet()
-    story = []
-
-    title_style = ParagraphStyle(
-        "CustomTitle",
-        parent=styles["Heading1"],
-        fontSize=16,
-        textColor=colors.HexColor("#1a1a1a"),
-        spaceAfter=14,
-        leading=20
-    )
-    normal_style = ParagraphStyle(
-        "CustomNormal",
-        parent=styles["Normal"],
-        fontSize=10,
-        spaceAfter=6,
-        leading=14
-    )
-
-    story.append(Paragraph("Eye Photo + Gemini Notes", title_style))
-    story.append(Spacer(1, 10))
-
-    if image_bytes:
-        img_buf = io.BytesIO(image_bytes)
-        rl_img = RLImage(img_buf)
-        rl_img._restrictSize(440, 280)
-        story.append(rl_img)
-        story.append(Spacer(1, 14))
-
-    lines = text_content.split("\n")
-    i = 0
-    while i < len(lines):
-        stripped = lines[i].strip()
-
-        if not stripped:
-            story.append(Spacer(1, 8))
-            i += 1
-            continue
-
-        if "|" in stripped and i + 1 < len(lines) and "|" in lines[i + 1]:
-            table_data = []
-            while i < len(lines) and "|" in lines[i].strip():
-                row = lines[i].strip()
-
-                if re.match(r"^[\|\s\-:]+$", row):
-                    i += 1
-                    continue
-
-                cells = [cell.strip() for cell in row.split("|") if cell.strip() != ""]
-                if cells:
-                    table_data.append(cells)
-                i += 1
-
-            if table_data:
-                t = Table(table_data, hAlign="CENTER")
-                t.setStyle(TableStyle([
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#3498db")),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                    ("FONTSIZE", (0, 0), (-1, 0), 10),
-                    ("BOTTOMPADDING", (0, 0), (-1, 0), 10),
-                    ("TOPPADDING", (0, 0), (-1, 0), 10),
-                    ("BACKGROUND", (0, 1), (-1, -1), colors.whitesmoke),
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                    ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
-                    ("FONTSIZE", (0, 1), (-1, -1), 9),
-                ]))
-                story.append(t)
-                story.append(Spacer(1, 12))
-            continue
-
-        story.append(Paragraph(stripped, normal_style))
-        i += 1
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer.getvalue()
+@st.cache_resource
+def get_frame_registry(ttl_s: float, max_stores: int):
+    # Shared by all sessions, keyed by capture content. Idle captures are dropped
+    # after the TTL; a run that already holds one keeps reading it.
+    return FrameStoreRegistry(ttl_s=ttl_s, max_stores=max_stores)
+
+def frame_registry() -> FrameStoreRegistry:
+    return get_frame_registry(FRAME_STORE_TTL_S, FRAME_STORE_MAX)
+
+def get_captured_frames():
+    return frame_registry().get(st.session_state.frame_store_id)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def preview_image(fingerprint: str, _first_frame) -> bytes:
+    # Rendered once per capture; reruns reuse the small JPEG
+    return resized_jpeg(_first_frame, PREVIEW_WIDTH)
+
+# ---------------------------
+# Analysis cache
+# ---------------------------
+
+@st.cache_resource
+def get_analysis_cache(directory: str, max_mb: float):
+    return AnalysisCache(directory, max_bytes=int(max_mb * 1024 * 1024))
+
+def show_timings(profile: RequestProfile):
+    if SHOW_TIMINGS:
+        with st.expander(f"⏱️ Timings ({profile.request}: {profile.total_ms:.0f} ms)"):
+            st.dataframe(profile.rows(), use_container_width=True, hide_index=True)
+
+# Why the capture component stopped (container metadata "stop_reason")
+STOP_REASONS = {
+    "blinks": "stopped once enough blinks were recorded",
+    "frame_budget": "stopped at the usual length, or at the first blink after it",
+    "max_frames": "stopped at the frame limit",
+    "fixed": "fixed-length capture",
+}
 
 # ---------------------------
 # Webcam Component with Live Frame Preview
@@ -173,7 +148,9 @@ def generate_pdf_from_text_and_image(text_content: str, image_bytes: bytes | Non
 
 def webcam_with_hidden_upload():
     """
-    Captures frames and creates a Blob, then programmatically uploads via hidden file input
+    Captures frames until enough blinks are seen (CAPTURE_* settings), packs them
+    into a frame container (see frame_container.py),
+    then programmatically uploads it via the hidden file input
     NOW WITH LIVE FRAME PREVIEW!
     """
     
@@ -181,7 +158,6 @@ def webcam_with_hidden_upload():
 <!DOCTYPE html>
 <html>
 <head>
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/jszip/3.10.1/jszip.min.js"></script>
 </head>
 <body>
     <div style="text-align: center;">
@@ -203,7 +179,28 @@ def webcam_with_hidden_upload():
         <p id="progress" style="margin-top: 5px; font-size: 14px; font-weight: bold; color: #3498db;"></p>
     </div>
 
+    <!-- JPEG encoder worker: ImageBitmaps in, JPEG blobs out, off the main thread -->
+    <script id="encoderWorker" type="text/js-worker">
+        let canvas = null;
+        let ctx = null;
+        self.onmessage = async (e) => {
+            const { index, bitmap, quality } = e.data;
+            if (!canvas || canvas.width !== bitmap.width || canvas.height !== bitmap.height) {
+                canvas = new OffscreenCanvas(bitmap.width, bitmap.height);
+                ctx = canvas.getContext('2d');
+            }
+            ctx.drawImage(bitmap, 0, 0);
+            bitmap.close();
+            const blob = await canvas.convertToBlob({ type: 'image/jpeg', quality });
+            self.postMessage({ index, blob });
+        };
+    </script>
+
     <script>
+        const CAPTURE = __CAPTURE_CONFIG__;
+        const JPEG_QUALITY = 0.85;
+        const MAX_IN_FLIGHT = 8;   // frames waiting in the encoder; newer frames are skipped beyond this
+
         const video = document.getElementById('video');
         const canvas = document.getElementById('canvas');
         const previewCanvas = document.getElementById('previewCanvas');
@@ -216,6 +213,195 @@ def webcam_with_hidden_upload():
 
         let stream = null;
 
+        // Frame container: header + timestamps + lengths + JSON metadata, then the
+        // JPEG blobs as-is. Blob concatenation doesn't copy or recompress anything.
+        function packFrames(blobs, timestamps, meta) {
+            const n = blobs.length;
+            const metaBytes = new TextEncoder().encode(JSON.stringify(meta));
+            const header = new ArrayBuffer(16 + 12 * n);
+            const dv = new DataView(header);
+            'BLNK'.split('').forEach((c, i) => dv.setUint8(i, c.charCodeAt(0)));
+            dv.setUint16(4, 1, true);                 // version
+            dv.setUint16(6, 0, true);                 // reserved
+            dv.setUint32(8, n, true);                 // frame count
+            dv.setUint32(12, metaBytes.length, true); // metadata length
+            for (let i = 0; i < n; i++) {
+                dv.setFloat64(16 + 8 * i, timestamps[i], true);
+                dv.setUint32(16 + 8 * n + 4 * i, blobs[i].size, true);
+            }
+            return new Blob([header, metaBytes, ...blobs], { type: 'application/octet-stream' });
+        }
+
+        // Adaptive length: FaceMesh eye openness, same EAR rule as the Blink Monitor.
+        // Frames are sampled whenever the detector is idle, so it never holds up capture.
+        const R_EYE = [33, 160, 158, 133, 153, 144];
+        const L_EYE = [362, 385, 387, 263, 373, 380];
+        const EMA_ALPHA = 0.08;        // baseline smoothing
+        const THRESH_RATIO = 0.72;     // closed = below baseline * this
+        const MIN_CLOSED_SAMPLES = 2;
+
+        __MEDIAPIPE_LOADER__
+
+        // The blink detector loads and warms up with the page, while the user gets ready
+        const faceMeshReady = !CAPTURE.targetBlinks ? Promise.resolve(null) : loadFaceMesh({
+            maxNumFaces: 1,
+            refineLandmarks: false,
+            minDetectionConfidence: 0.5,
+            minTrackingConfidence: 0.5
+        }).catch((err) => {
+            console.warn('FaceMesh unavailable, capturing a fixed number of frames:', err);
+            return null;
+        });
+
+        function eyeEAR(lm, [p1, p2, p3, p4, p5, p6]) {
+            const d = (a, b) => Math.hypot(lm[a].x - lm[b].x, lm[a].y - lm[b].y);
+            const horiz = d(p1, p4);
+            return horiz > 1e-6 ? (d(p2, p6) + d(p3, p5)) / (2 * horiz) : null;
+        }
+
+        // Tracks complete blinks (first closed / first reopened frame index) and
+        // decides when the capture has enough. Without FaceMesh: fixed length.
+        function createBlinkWatcher(fm) {
+            const blinks = [];
+            let baseline = null;
+            let closed = 0;
+            let blinkStart = 0;
+            let lastBlinkEnd = null;   // performance.now() when the last blink reopened
+            let busy = false;
+            let sampleIndex = 0;
+            let samples = 0;
+
+            if (fm) {
+                fm.onResults((results) => {
+                    busy = false;
+                    const lm = results.multiFaceLandmarks && results.multiFaceLandmarks[0];
+                    const earR = lm ? eyeEAR(lm, R_EYE) : null;
+                    const earL = lm ? eyeEAR(lm, L_EYE) : null;
+                    if (earR == null || earL == null) {
+                        closed = 0;   // lost the face: drop a blink in progress
+                        return;
+                    }
+                    const ear = (earR + earL) / 2;
+                    if (baseline === null) {
+                        baseline = ear;
+                    } else if (ear > baseline * 0.6) {
+                        baseline = (1 - EMA_ALPHA) * baseline + EMA_ALPHA * ear;
+                    }
+
+                    if (ear < baseline * THRESH_RATIO) {
+                        if (closed++ === 0) blinkStart = sampleIndex;
+                    } else {
+                        if (closed >= MIN_CLOSED_SAMPLES) {
+                            blinks.push({ start: blinkStart, end: sampleIndex });
+                            lastBlinkEnd = performance.now();
+                        }
+                        closed = 0;
+                    }
+                });
+            }
+
+            return {
+                blinks,
+                get samples() { return samples; },
+                observe(index, image) {
+                    if (!fm || busy) return;
+                    busy = true;
+                    sampleIndex = index;
+                    samples++;
+                    fm.send({ image }).catch(() => { busy = false; });
+                },
+                // null = keep going, else why to stop with `frames` captured
+                stopReason(frames) {
+                    if (frames >= CAPTURE.maxFrames) return 'max_frames';
+                    if (!fm || !CAPTURE.targetBlinks) return frames >= CAPTURE.frames ? 'fixed' : null;
+                    if (frames < CAPTURE.minFrames || closed > 0) return null;   // never cut a blink in half
+                    const trailed = lastBlinkEnd !== null && performance.now() - lastBlinkEnd >= CAPTURE.trailingMs;
+                    if (blinks.length >= CAPTURE.targetBlinks && trailed) return 'blinks';
+                    // At the usual length: stop if a blink was seen by then, else stop after the first one
+                    const seenInTime = blinks.length > 0 && blinks[0].end < CAPTURE.frames;
+                    if (frames >= CAPTURE.frames && (seenInTime || trailed)) return 'frame_budget';
+                    return null;
+                }
+            };
+        }
+
+        const canUseWorker = 'requestVideoFrameCallback' in HTMLVideoElement.prototype
+            && typeof OffscreenCanvas !== 'undefined';
+
+        // One callback per decoded camera frame, stamped with the frame's own capture
+        // time; the worker encodes while the next frame arrives.
+        function captureWithWorker(watcher, onProgress) {
+            return new Promise((resolve, reject) => {
+                const src = document.getElementById('encoderWorker').textContent;
+                const worker = new Worker(URL.createObjectURL(new Blob([src], { type: 'text/javascript' })));
+                const blobs = [];
+                const timestamps = [];
+                let requested = 0;
+                let encoded = 0;
+                let skipped = 0;
+                let stopReason = null;
+
+                const finish = () => {
+                    worker.terminate();
+                    resolve({ blobs, timestamps, skipped, stopReason, source: 'video-frame-callback' });
+                };
+                worker.onerror = (err) => { worker.terminate(); reject(err); };
+                worker.onmessage = (e) => {
+                    blobs[e.data.index] = e.data.blob;
+                    encoded++;
+                    onProgress(encoded);
+                    if (stopReason && encoded === requested) finish();
+                };
+
+                const onFrame = async (now, metadata) => {
+                    if (stopReason) return;
+                    stopReason = watcher.stopReason(requested);
+                    if (stopReason) {
+                        // Frames still in the encoder resolve through onmessage
+                        if (encoded === requested) finish();
+                        return;
+                    }
+                    video.requestVideoFrameCallback(onFrame);
+
+                    if (requested - encoded >= MAX_IN_FLIGHT) {
+                        skipped++;
+                        return;
+                    }
+                    const index = requested++;
+                    // captureTime is the camera's timestamp; mediaTime is the fallback
+                    timestamps[index] = metadata.captureTime ?? metadata.mediaTime * 1000;
+                    const bitmap = await createImageBitmap(video);
+                    if (index % 3 === 0) {
+                        previewCtx.drawImage(bitmap, 0, 0, 320, 240);
+                    }
+                    worker.postMessage({ index, bitmap, quality: JPEG_QUALITY }, [bitmap]);
+                    watcher.observe(index, video);
+                };
+                video.requestVideoFrameCallback(onFrame);
+            });
+        }
+
+        // Older browsers: encode on the main thread, timestamped when each frame is drawn
+        async function captureOnMainThread(watcher, onProgress) {
+            canvas.width = video.videoWidth;
+            canvas.height = video.videoHeight;
+            const blobs = [];
+            const timestamps = [];
+            let stopReason = null;
+            for (let i = 0; !(stopReason = watcher.stopReason(i)); i++) {
+                ctx.drawImage(video, 0, 0);
+                timestamps.push(performance.now());
+                watcher.observe(i, video);
+                if (i % 3 === 0) {
+                    previewCtx.drawImage(video, 0, 0, 320, 240);
+                }
+                blobs.push(await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', JPEG_QUALITY)));
+                onProgress(i + 1);
+                await new Promise(resolve => setTimeout(resolve, 30));
+            }
+            return { blobs, timestamps, skipped: 0, stopReason, source: 'main-thread' };
+        }
+
         startBtn.onclick = async () => {
             try {
                 status.textContent = 'Requesting camera access...';
@@ -239,54 +425,62 @@ def webcam_with_hidden_upload():
             }
 
             captureBtn.disabled = true;
+            status.textContent = '⏳ Loading blink detector...';
+            const faceMesh = await faceMeshReady;
             status.textContent = '📸 Capturing frames... Look at camera and blink normally.';
             
             // Show preview canvas
             previewCanvas.style.display = 'inline-block';
 
-            canvas.width = video.videoWidth;
-            canvas.height = video.videoHeight;
-
-            const capturedFrames = [];
-
-            // Capture 120 frames
-            for (let i = 0; i < 120; i++) {
-                ctx.drawImage(video, 0, 0);
-
-                // NEW: Show current frame in preview (every 3rd frame to avoid lag)
-                if (i % 3 === 0) {
-                    previewCtx.drawImage(video, 0, 0, 320, 240);
+            let watcher = createBlinkWatcher(faceMesh);
+            const onProgress = (n) => {
+                if (!faceMesh) {
+                    progress.textContent = `Captured ${n}/${CAPTURE.frames} frames`;
+                } else if (n > CAPTURE.frames && !watcher.blinks.length) {
+                    progress.textContent = `Captured ${n} frames · no blink yet, keep looking at the camera`;
+                } else {
+                    progress.textContent = `Captured ${n} frames · ${watcher.blinks.length}/${CAPTURE.targetBlinks} blinks`;
                 }
-
-                // Convert to blob
-                const blob = await new Promise(resolve => {
-                    canvas.toBlob(resolve, 'image/jpeg', 0.85);
-                });
-
-                capturedFrames.push(blob);
-                progress.textContent = `Captured ${i + 1}/120 frames`;
-                await new Promise(resolve => setTimeout(resolve, 30));
+            };
+            let captured;
+            try {
+                captured = canUseWorker
+                    ? await captureWithWorker(watcher, onProgress)
+                    : await captureOnMainThread(watcher, onProgress);
+            } catch (err) {
+                console.error('Worker capture failed, retrying on the main thread:', err);
+                watcher = createBlinkWatcher(faceMesh);
+                captured = await captureOnMainThread(watcher, onProgress);
             }
 
-            status.textContent = '📦 Creating ZIP file...';
             progress.textContent = '';
 
-            // Create ZIP
-            const zip = new JSZip();
-            for (let i = 0; i < capturedFrames.length; i++) {
-                zip.file(`frame_${String(i).padStart(3, '0')}.jpg`, capturedFrames[i]);
-            }
-
-            const zipBlob = await zip.generateAsync({type: 'blob'});
+            const t0 = captured.timestamps[0];
+            const timestamps = captured.timestamps.map(t => t - t0);
+            const n = captured.blobs.length;
+            const container = packFrames(captured.blobs, timestamps, {
+                width: video.videoWidth,
+                height: video.videoHeight,
+                quality: JPEG_QUALITY,
+                source: captured.source,
+                skipped: captured.skipped,
+                stop_reason: captured.stopReason,
+                target_blinks: faceMesh ? CAPTURE.targetBlinks : null,
+                blink_samples: watcher.samples,
+                // Complete blinks seen while capturing: first closed / first reopened frame
+                blinks: watcher.blinks
+                    .filter(b => b.end < n)
+                    .map(b => ({ start: b.start, end: b.end, start_ms: timestamps[b.start], end_ms: timestamps[b.end] }))
+            });
 
             status.textContent = '📤 Uploading to Streamlit...';
 
             // Find Streamlit's file uploader in parent document
-            const fileUploader = window.parent.document.querySelector('input[type="file"][accept=".zip"]');
+            const fileUploader = window.parent.document.querySelector('input[type="file"][accept*=".blnk"]');
 
             if (fileUploader) {
                 // Create a File object from the blob
-                const file = new File([zipBlob], 'captured_frames.zip', { type: 'application/zip' });
+                const file = new File([container], 'captured_frames.blnk', { type: 'application/octet-stream' });
 
                 // Create DataTransfer to set files
                 const dataTransfer = new DataTransfer();
@@ -312,6 +506,15 @@ def webcam_with_hidden_upload():
 </html>
 """
     
+    capture_config = {
+        "frames": CAPTURE_FRAMES,
+        "minFrames": min(CAPTURE_MIN_FRAMES, CAPTURE_FRAMES),
+        "maxFrames": max(CAPTURE_MAX_FRAMES, CAPTURE_FRAMES),
+        "targetBlinks": CAPTURE_TARGET_BLINKS,
+        "trailingMs": CAPTURE_TRAILING_MS,
+    }
+    html_code = html_code.replace("__CAPTURE_CONFIG__", json.dumps(capture_config))
+    html_code = html_code.replace("__MEDIAPIPE_LOADER__", loader_js())
     st.components.v1.html(html_code, height=780)
 
 # ---------------------------
@@ -327,38 +530,76 @@ st.markdown("### AI-Powered Eye Health Assessment")
 st.subheader("Step 1: Capture frames")
 
 # Initialize session state
-if 'captured_frames' not in st.session_state:
-    st.session_state.captured_frames = None
+# Frames live in the shared frame store, keyed by the capture's content hash;
+# the session only keeps that fingerprint
+if 'frame_store_id' not in st.session_state:
+    st.session_state.frame_store_id = None
 
 # Render webcam component
 webcam_with_hidden_upload()
 
 # Hidden file uploader (will be auto-filled by JavaScript)
-uploaded_zip = st.file_uploader("", type=['zip'], key="auto_upload", label_visibility="collapsed")
-
-# Process uploaded ZIP
-if uploaded_zip is not None:
-    import zipfile
-    try:
-        with zipfile.ZipFile(uploaded_zip, 'r') as zip_ref:
-            frame_files = sorted([f for f in zip_ref.namelist() if f.endswith('.jpg')])
-            
-            if len(frame_files) < 1:
-                st.error("No JPG files found in the ZIP!")
-            else:
-                frames_bytes = []
-                for frame_file in frame_files:
-                    with zip_ref.open(frame_file) as f:
-                        frames_bytes.append(f.read())
-
-                st.session_state.captured_frames = frames_bytes
-                st.success(f"✅ Loaded {len(frames_bytes)} frames!")
+# Accepts the frame container from the component, or a ZIP of frame_XXX.jpg files
+uploaded_capture = st.file_uploader("", type=[CONTAINER_EXTENSION, 'zip'], key="auto_upload", label_visibility="collapsed")
+timer.first_render()
+
+# Process uploaded capture.
+# The uploader returns the same file on every rerun; it is only decoded when
+# it is a new upload whose content isn't in the frame store yet.
+if uploaded_capture is not None:
+    store = get_captured_frames()
+    if store is None or st.session_state.get("capture_file_id") != uploaded_capture.file_id:
+        store = None
+        with RequestProfile("upload", bytes=uploaded_capture.size) as profile:
+            try:
+                with profile.span("fingerprint", bytes=uploaded_capture.size) as span:
+                    fingerprint = capture_fingerprint(uploaded_capture.getbuffer())
+                    store = frame_registry().get(fingerprint)
+                    span["hit"] = store is not None
+
+                if store is None:
+                    with profile.span("decode", bytes=uploaded_capture.size) as span:
+                        # getbuffer() is a view of the upload; frames are sliced out of it without copying
+                        capture = load_capture(uploaded_capture.getbuffer())
+                        span["frames"] = len(capture.frames)
+
+                    if len(capture.frames) < 1:
+                        st.error("No frames found in the upload!")
+                    else:
+                        with profile.span("frame_store", frames=len(capture.frames)) as span:
+                            store = FrameStore(capture.frames, timestamps_ms=capture.timestamps_ms, meta=capture.meta)
+                            store = frame_registry().setdefault(fingerprint, store)
+                            span["bytes"] = store.nbytes
+
+                if store is not None:
+                    st.session_state.frame_store_id = fingerprint
+                    st.session_state.capture_file_id = uploaded_capture.file_id
+                    with profile.span("preview"):
+                        preview_image(fingerprint, store[0])
+
+            except Exception as e:
+                st.error(f"Error reading uploaded frames: {e}")
+        show_timings(profile)
+
+    if store is not None:
+        if store.timestamps_ms is not None and len(store) > 1:
+            intervals = np.diff(store.timestamps_ms)
+            st.success(
+                f"✅ Loaded {len(store)} frames! "
+                f"({1000 / np.median(intervals):.1f} fps, frame interval jitter ±{np.std(intervals):.1f} ms)"
+            )
+        else:
+            st.success(f"✅ Loaded {len(store)} frames!")
 
-                # Show first frame
-                st.image(frames_bytes[0], caption=f"First frame (total: {len(frames_bytes)} frames)", use_column_width=True)
+        if store.meta.get("stop_reason") in STOP_REASONS:
+            st.caption(
+                f"Blinks seen while capturing: {len(store.meta.get('blinks') or [])} · "
+                f"{STOP_REASONS[store.meta['stop_reason']]}"
+            )
 
-    except Exception as e:
-        st.error(f"Error reading ZIP file: {e}")
+        # Show first frame
+        st.image(preview_image(st.session_state.frame_store_id, store[0]),
+                 caption=f"First frame (total: {len(store)} frames)", width=PREVIEW_WIDTH)
 
 st.write("---")
 
@@ -380,51 +621,124 @@ age_num = st.number_input(
 
 st.write("---")
 
+def show_blink_metrics(blink_stats: dict):
+    st.subheader("Measured Blinks:")
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Blinks", blink_stats["blink_count"] if blink_stats["blink_count"] is not None else "-")
+    m2.metric("Blinks/min", blink_stats["blinks_per_minute"] if blink_stats["blinks_per_minute"] is not None else "-")
+    m3.metric("Avg blink (ms)", blink_stats["mean_blink_ms"] if blink_stats["mean_blink_ms"] is not None else "-")
+    m4.metric("Face found", f"{blink_stats['face_frames']}/{blink_stats['frames']} frames")
+    if blink_stats["blink_count"] is None:
+        st.warning("Face not detected in enough frames, so blinks were not counted. "
+                   "Recapture facing the camera in good light for measured results.")
+
+def show_upload_stats(upload_frames, clip=None, sheets=None):
+    if isinstance(upload_frames, EyeCropper):
+        crop = upload_frames.stats()
+        st.caption(
+            f"Eye-region crops: {crop['frames']} frames, {crop['bytes_before'] // 1024} KB → "
+            f"{crop['bytes_after'] // 1024} KB ({crop['ms_per_frame']} ms/frame)"
+        )
+    if clip is not None:
+        images_bytes = sum(len(memoryview(upload_frames[i])) for i in range(len(upload_frames)))
+        st.caption(
+            f"Video clip: {clip.frames} frames at {clip.fps} fps as {clip.codec}, {len(clip.data) // 1024} KB "
+            f"(as images: {images_bytes // 1024} KB), encoded in {clip.encode_ms} ms"
+        )
+    if sheets:
+        images_bytes = sum(len(memoryview(upload_frames[i])) for i in range(len(upload_frames)))
+        cols, rows = sheets[0].cols, sheets[0].rows
+        st.caption(
+            f"Contact sheets: {len(upload_frames)} frames on {len(sheets)} images of {cols}x{rows} tiles, "
+            f"{sum(len(s.data) for s in sheets) // 1024} KB (as {len(upload_frames)} images: {images_bytes // 1024} KB)"
+        )
+
+def show_pdf_download(pdf_content: bytes | None):
+    if pdf_content:
+        st.subheader("Step 5: Download your Report")
+        st.download_button(
+            label="Download PDF Report ⬇️",
+            data=pdf_content,
+            file_name="eye_health_recommendations.pdf",
+            mime="application/pdf"
+        )
+
+class PageHooks(AnalysisHooks):
+    """Draws each step of analyze() on the page."""
+
+    def busy(self, message: str):
+        return st.spinner(message)
+
+    def blinks_measured(self, blink_stats: dict):
+        show_blink_metrics(blink_stats)
+
+    def blinks_failed(self, error: Exception):
+        st.warning(f"Could not measure blinks locally: {error}")
+
+    def windows_failed(self, chunked):
+        st.warning(
+            f"{len(chunked.failed)} of {len(chunked.windows)} frame windows could not be analyzed: "
+            + ", ".join(f"{w.first}-{w.last}" for w in chunked.failed)
+        )
+
+    def stream_started(self, upload):
+        show_upload_stats(upload.frames, upload.clip, upload.sheets)
+        st.subheader("Analysis Results:")
+        self.placeholder = st.empty()
+
+    def streamed(self, text: str, done: bool):
+        self.placeholder.markdown(text if done else text + " ▌")
+
+    def show_results(self, text: str, upload):
+        show_upload_stats(upload.frames, upload.clip, upload.sheets)
+        st.subheader("Analysis Results:")
+        st.write(text)
+
 if st.button("Step 4: 📊 Analyze Frames with AI", key="analyze_btn"):
-    if st.session_state.captured_frames is None or len(st.session_state.captured_frames) == 0:
+    frames = get_captured_frames()
+    if frames is None or len(frames) == 0:
         st.error("⚠️ Please capture frames first using the button above!")
     else:
-        frames = st.session_state.captured_frames
-        
-        try:
-            st.image(frames[0], caption="Analyzing this frame and others...", use_column_width=True)
-        except Exception as e:
-            st.warning(f"Could not display preview image: {e}")
-
-        prompt = f"""
-You are given {len(frames)} sequential eye images (frames) from a webcam.
-Task: Check for possible blinking problems or abnormal blinking patterns.
-
-- You cannot diagnose.
-- Give careful observations and safe advice only.
-- Keep it short and focused.
-- List urgent red flags that require an eye doctor.
-
-Patient context:
-- Country: {patient_country}
-- City: {patient_city}
-- Age: {age_num}
-"""
-        
-        # Prepare content for Gemini
-        contents = [prompt]
-        for frame_bytes in frames:
-            contents.append({"mime_type": "image/jpeg", "data": frame_bytes})
-        
-        with st.spinner(f"Analyzing {len(frames)} frames with Gemini AI..."):
-            response = model.generate_content(contents)
-        
-        st.subheader("Analysis Results:")
-        st.write(response.text)
-        
-        # Generate PDF
-        pdf_content = generate_pdf_from_text_and_image(response.text, frames[0])
-        
-        if pdf_content:
-            st.subheader("Step 5: Download your Report")
-            st.download_button(
-                label="Download PDF Report ⬇️",
-                data=pdf_content,
-                file_name="eye_health_recommendations.pdf",
-                mime="application/pdf"
+        with RequestProfile("analysis", frames=len(frames), mode=ANALYSIS_OPTIONS.mode,
+                            browser_blinks=len(frames.meta.get("blinks") or []),
+                            stop_reason=frames.meta.get("stop_reason")) as profile:
+            try:
+                with profile.span("preview"):
+                    st.image(preview_image(st.session_state.frame_store_id, frames[0]),
+                             caption="Analyzing this frame and others...", width=PREVIEW_WIDTH)
+            except Exception as e:
+                st.warning(f"Could not display preview image: {e}")
+
+            cache = get_analysis_cache(ANALYSIS_CACHE_DIR, ANALYSIS_CACHE_MAX_MB)
+            with profile.span("cache_lookup", bytes=frames.nbytes) as span:
+                cache_key = analysis_key(frames, gemini, ANALYSIS_OPTIONS, patient_country, patient_city, age_num)
+                cached = cache.get(cache_key)
+                span["hit"] = cached is not None
+
+            if cached is not None:
+                with profile.span("render_results"):
+                    if cached.get("blink_stats"):
+                        show_blink_metrics(cached["blink_stats"])
+
+                    st.subheader("Analysis Results:")
+                    st.caption("⚡ Same frames and details as an earlier analysis - showing the saved result.")
+                    st.write(cached["text"])
+                    show_pdf_download(cached["pdf"])
+            else:
+                result = analyze(gemini, frames, patient_country, patient_city, age_num,
+                                 ANALYSIS_OPTIONS, profile, PageHooks())
+                show_pdf_download(result.pdf)
+
+                # Don't keep a merged report that is missing windows
+                if result.complete:
+                    with profile.span("cache_store"):
+                        cache.put(cache_key, result.text, result.pdf, result.blink_stats)
+
+            stats = cache.stats()
+            api = gemini.stats()
+            st.caption(
+                f"Analysis cache: {stats['hits']} hits / {stats['misses']} misses, {stats['entries']} saved · "
+                f"Gemini: {api['in_flight']} in flight (peak {api['peak_in_flight']}), "
+                f"{api['requests']} requests, {api['errors']} errors"
             )
+        show_timings(profile)
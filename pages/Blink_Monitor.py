@@ -1,6 +1,17 @@
+from perf_log import PageTimer
+
+timer = PageTimer("blink_monitor")
+
+import json
+import sqlite3
+import time
 import streamlit as st
 import streamlit.components.v1 as components
 
+from blink_history import BlinkHistory, DEFAULT_DB_PATH
+from settings import get_setting
+from vendor_assets import loader_js
+
 st.set_page_config(page_title="Blink Monitor - Smart Tracking", layout="centered")
 
 if st.button("← Back to Home"):
@@ -11,15 +22,32 @@ st.markdown("### Monitor your blink rate to reduce eye strain")
 
 st.info("🎥 This version uses HTML5 camera API for better compatibility")
 
+MODE_BROWSER = "Browser (HTML5)"
+MODE_SERVER = "Server (WebRTC)"
+mode = st.radio(
+    "Blink detection runs in:",
+    [MODE_BROWSER, MODE_SERVER],
+    horizontal=True,
+    key="monitor_mode",
+    help="Pick Server if this computer is too slow to track your eyes in the browser.",
+)
+
+# Optional; read here rather than inside the cached resource below
+BLINK_HISTORY_DB = get_setting("BLINK_HISTORY_DB", DEFAULT_DB_PATH)
+
+@st.cache_resource
+def get_history(path: str):
+    # One SQLite connection per process (WAL, so history reads don't block writes)
+    return BlinkHistory(path)
+
 # HTML/JavaScript implementation with MediaPipe Face Mesh
+# (FaceMesh files from static/vendor/ when vendored, see vendor_assets.py)
 
 html_code = """
 <!DOCTYPE html>
 <html>
 <head>
   <meta charset="utf-8" />
-  <script src="https://cdn.jsdelivr.net/npm/@mediapipe/face_mesh/face_mesh.js" crossorigin="anonymous"></script>
-  <script src="https://cdn.jsdelivr.net/npm/@mediapipe/camera_utils/camera_utils.js" crossorigin="anonymous"></script>
 
   <style>
     body { font-family: Arial, sans-serif; text-align:center; margin:0; padding:20px; background:#f5f5f5; }
@@ -37,6 +65,8 @@ html_code = """
     #startBtn:hover { background:#2980b9; }
     #resetBtn { background:#e74c3c; color:white; }
     #resetBtn:hover { background:#c0392b; }
+    #perfBtn { background:#7f8c8d; color:white; }
+    #perfBtn:hover { background:#636e72; }
 
     #status { margin:20px 0; padding:10px; border-radius:5px; font-size:16px; }
     .status-ready { background:#d4edda; color:#155724; }
@@ -55,6 +85,7 @@ html_code = """
       color:white; padding:8px 10px; border-radius:6px; font-size:12px; text-align:left;
       min-width:170px;
     }
+    #perfHud { margin-top:6px; padding-top:6px; border-top:1px solid rgba(255,255,255,0.3); font-family:monospace; font-size:11px; }
 
     #blinkReminder { position:absolute; top:50px; right:60px; display:none; text-align:center; }
     .reminder-text { color:white; font-size:14px; font-weight:bold; margin-top:5px; text-shadow:2px 2px 4px rgba(0,0,0,.5); }
@@ -79,6 +110,7 @@ html_code = """
 
   <button id="startBtn">Start Camera</button>
   <button id="resetBtn">Reset Session</button>
+  <button id="perfBtn">Export Performance JSON</button>
 
   <div id="status" class="status-warning">Click "Start Camera" to begin monitoring</div>
 
@@ -91,6 +123,11 @@ html_code = """
       Base: <span id="baseVal">-</span><br/>
       Thr: <span id="thrVal">-</span><br/>
       Face: <span id="faceVal">No</span>
+      <div id="perfHud">
+        Infer p50/p95: <span id="inferVal">-</span><br/>
+        FPS: <span id="fpsVal">-</span> · Skipped: <span id="skipVal">-</span><br/>
+        onResults: <span id="sectVal">-</span>
+      </div>
     </div>
 
     <div id="eyeStatus" class="eyes-open">Eyes: OPEN</div>
@@ -105,8 +142,7 @@ html_code = """
   </div>
 
   <script type="module">
-    // IMPORTANT: In module scope, sometimes globals must be accessed via window.
-    const FaceMesh = window.FaceMesh;
+    __MEDIAPIPE_LOADER__
 
     const video = document.getElementById('video');
     const canvas = document.getElementById('canvas');
@@ -128,12 +164,128 @@ html_code = """
     const thrVal = document.getElementById('thrVal');
     const faceVal = document.getElementById('faceVal');
 
+    const perfBtn = document.getElementById('perfBtn');
+    const inferVal = document.getElementById('inferVal');
+    const fpsVal = document.getElementById('fpsVal');
+    const skipVal = document.getElementById('skipVal');
+    const sectVal = document.getElementById('sectVal');
+
+    // ---------------------------
+    // Performance HUD
+    // ---------------------------
+    // Rolling windows of per-frame timings (ms). "skipped" counts camera frames
+    // that were presented while the previous faceMesh.send() was still running.
+    const PERF_WINDOW = 300;
+    const HUD_INTERVAL = 250;
+    const SECTIONS = ['clear', 'ear', 'state', 'draw', 'total'];
+
+    function newPerf(){
+      const sections = {};
+      SECTIONS.forEach(k => sections[k] = []);
+      return {
+        startedAt: performance.now(),
+        inference: [],
+        resultTimes: [],
+        sections,
+        processed: 0,
+        skipped: 0,
+        lastPresented: null,
+        lastHud: 0
+      };
+    }
+    let perf = newPerf();
+
+    function pushWindow(arr, value){
+      arr.push(value);
+      if (arr.length > PERF_WINDOW) arr.shift();
+    }
+
+    function pct(arr, q){
+      if (!arr.length) return null;
+      const s = [...arr].sort((a, b) => a - b);
+      const k = (s.length - 1) * q / 100;
+      const lo = Math.floor(k), hi = Math.min(lo + 1, s.length - 1);
+      return s[lo] + (s[hi] - s[lo]) * (k - lo);
+    }
+
+    function effectiveFps(){
+      const t = perf.resultTimes;
+      if (t.length < 2) return null;
+      return 1000 * (t.length - 1) / (t[t.length - 1] - t[0]);
+    }
+
+    function perfSummary(){
+      const sections = {};
+      SECTIONS.forEach(k => {
+        sections[k] = { p50: pct(perf.sections[k], 50), p95: pct(perf.sections[k], 95) };
+      });
+      return {
+        inference_ms: {
+          p50: pct(perf.inference, 50), p95: pct(perf.inference, 95),
+          p99: pct(perf.inference, 99), max: perf.inference.length ? Math.max(...perf.inference) : null
+        },
+        effective_fps: effectiveFps(),
+        frames_processed: perf.processed,
+        frames_skipped: perf.lastPresented === null ? null : perf.skipped,
+        model_ready_ms: modelReadyMs,
+        on_results_ms: sections
+      };
+    }
+
+    function updateHud(now){
+      if (now - perf.lastHud < HUD_INTERVAL) return;
+      perf.lastHud = now;
+      const fmt = (v, d = 1) => v == null ? '-' : v.toFixed(d);
+      const s = perfSummary();
+      inferVal.textContent = `${fmt(s.inference_ms.p50)}/${fmt(s.inference_ms.p95)} ms`;
+      fpsVal.textContent = fmt(s.effective_fps);
+      skipVal.textContent = s.frames_skipped == null ? '-' : s.frames_skipped;
+      sectVal.textContent = ['ear', 'state', 'draw', 'total']
+        .map(k => `${k} ${fmt(s.on_results_ms[k].p95, 2)}`).join(' · ') + ' ms (p95)';
+    }
+
+    function exportPerf(){
+      const report = {
+        exported_at: new Date().toISOString(),
+        duration_s: (performance.now() - perf.startedAt) / 1000,
+        client: {
+          user_agent: navigator.userAgent,
+          hardware_concurrency: navigator.hardwareConcurrency || null,
+          device_memory_gb: navigator.deviceMemory || null,
+          video: { width: video.videoWidth, height: video.videoHeight }
+        },
+        summary: perfSummary(),
+        samples: { inference_ms: perf.inference, on_results_ms: perf.sections }
+      };
+      const blob = new Blob([JSON.stringify(report, null, 2)], { type: 'application/json' });
+      const a = document.createElement('a');
+      a.href = URL.createObjectURL(blob);
+      a.download = `blink_monitor_perf_${Date.now()}.json`;
+      document.body.appendChild(a);
+      a.click();
+      a.remove();
+      setTimeout(() => URL.revokeObjectURL(a.href), 1000);
+    }
+
     let blinkCount = 0;
     let minuteStart = Date.now();
     let sessionStart = Date.now();
 
     let faceMesh = null;
 
+    // Model download and warm-up start with the page, not with the camera
+    let modelReadyMs = null;
+    const faceMeshReady = loadFaceMesh({
+      maxNumFaces: 1,
+      refineLandmarks: true,
+      minDetectionConfidence: 0.5,
+      minTrackingConfidence: 0.5
+    }).then((fm) => {
+      modelReadyMs = performance.now();
+      return fm;
+    });
+    faceMeshReady.catch((err) => console.error('FaceMesh failed to load:', err));
+
     // Reminder state
     let showReminder = false;
     let reminderStart = 0;
@@ -156,6 +308,56 @@ html_code = """
     const MIN_CLOSED_FRAMES = 2;   // must be closed for at least this many frames
     let closedFrames = 0;
     let inBlink = false;
+    let blinkStart = 0;
+
+    // ---------------------------
+    // History sync
+    // ---------------------------
+    // Blink events and per-minute rollups are buffered here and sent to Streamlit
+    // about once a minute (and on reset / session end) as a JSON file through the
+    // hidden uploader below the component. Unsent data is kept for the next try.
+    let sessionId = crypto.randomUUID();
+    let sessionEpoch = Date.now();
+    let minuteIndex = 0;
+    let pendingEvents = [];
+    let pendingMinutes = [];
+    let batchSeq = 0;
+
+    function recordBlink(durationMs){
+      pendingEvents.push({ t: Date.now() / 1000, duration_ms: durationMs, minute: minuteIndex });
+    }
+
+    function flushHistory(includeCurrent = true){
+      if (!faceMesh) return;  // camera never started
+      const minutes = [...pendingMinutes];
+      if (includeCurrent && (blinkCount > 0 || Date.now() - minuteStart >= 10000)) {
+        // Partial rollup of the running minute; overwritten once it completes
+        minutes.push({
+          minute: minuteIndex, started_at: minuteStart / 1000, blinks: blinkCount, complete: false,
+          seconds: (Date.now() - minuteStart) / 1000
+        });
+      }
+      if (!pendingEvents.length && !minutes.length) return;
+
+      const uploader = window.parent.document.querySelector('input[type="file"][accept*=".json"]');
+      if (!uploader) return;
+
+      const batch = {
+        session_id: sessionId,
+        source: 'browser',
+        started_at: sessionEpoch / 1000,
+        events: pendingEvents,
+        minutes
+      };
+      const file = new File([JSON.stringify(batch)], `blink_batch_${sessionId}_${batchSeq++}.json`, { type: 'application/json' });
+      const dataTransfer = new DataTransfer();
+      dataTransfer.items.add(file);
+      uploader.files = dataTransfer.files;
+      uploader.dispatchEvent(new Event('change', { bubbles: true }));
+
+      pendingEvents = [];
+      pendingMinutes = [];
+    }
 
     function dist(a, b){
       const dx = a.x - b.x;
@@ -187,17 +389,14 @@ html_code = """
         });
         video.srcObject = stream;
 
-        faceMesh = new FaceMesh({
-          locateFile: (file) => `https://cdn.jsdelivr.net/npm/@mediapipe/face_mesh/${file}`
-        });
-
-        faceMesh.setOptions({
-          maxNumFaces: 1,
-          refineLandmarks: true,
-          minDetectionConfidence: 0.5,
-          minTrackingConfidence: 0.5
-        });
-
+        if (modelReadyMs === null) statusDiv.textContent = 'Loading the face model...';
+        faceMesh = await faceMeshReady.catch(() => null);
+        if (!faceMesh) {
+          stream.getTracks().forEach(t => t.stop());
+          statusDiv.textContent = '❌ Could not load the face model. Check the connection and refresh.';
+          statusDiv.className = 'status-error';
+          return;
+        }
         faceMesh.onResults(onResults);
 
         await video.play();
@@ -219,15 +418,53 @@ html_code = """
       }
     }
 
+    // Frames the camera presented so far (Chrome/Safari); used to count skipped frames
+    let presentedFrames = null;
+    if ('requestVideoFrameCallback' in HTMLVideoElement.prototype) {
+      const onVideoFrame = (now, metadata) => {
+        presentedFrames = metadata.presentedFrames;
+        video.requestVideoFrameCallback(onVideoFrame);
+      };
+      video.requestVideoFrameCallback(onVideoFrame);
+    }
+
     async function processFrame(){
       if (faceMesh && video.readyState === 4){
+        if (presentedFrames !== null) {
+          if (perf.lastPresented !== null) {
+            perf.skipped += Math.max(0, presentedFrames - perf.lastPresented - 1);
+          }
+          perf.lastPresented = presentedFrames;
+        }
+        const t0 = performance.now();
         await faceMesh.send({ image: video });
+        pushWindow(perf.inference, performance.now() - t0);
       }
       requestAnimationFrame(processFrame);
     }
 
     function onResults(results){
+      const t0 = performance.now();
+      let mark = t0;
+      const section = (name) => {
+        const t = performance.now();
+        pushWindow(perf.sections[name], t - mark);
+        mark = t;
+      };
+      perf.processed++;
+      pushWindow(perf.resultTimes, t0);
+
+      try {
+        detect(results, section);
+      } finally {
+        pushWindow(perf.sections.total, performance.now() - t0);
+        updateHud(t0);
+      }
+    }
+
+    function detect(results, section){
       ctx.clearRect(0, 0, canvas.width, canvas.height);
+      section('clear');
 
       const hasFace = results.multiFaceLandmarks && results.multiFaceLandmarks.length > 0;
       faceVal.textContent = hasFace ? "Yes" : "No";
@@ -259,6 +496,7 @@ html_code = """
       }
 
       const threshold = emaBaseEAR * THRESH_RATIO;
+      section('ear');
 
       earVal.textContent = ear.toFixed(4);
       baseVal.textContent = emaBaseEAR.toFixed(4);
@@ -270,6 +508,8 @@ html_code = """
         eyeStatusDiv.textContent = 'Eyes: CLOSED';
         eyeStatusDiv.className = 'eyes-closed';
 
+        if (closedFrames === 1) blinkStart = performance.now();
+
         if (!inBlink && closedFrames >= MIN_CLOSED_FRAMES) {
           inBlink = true; // entered blink
         }
@@ -283,10 +523,12 @@ html_code = """
           // blink finished
           blinkCount++;
           blinkCountDiv.textContent = blinkCount;
+          recordBlink(performance.now() - blinkStart);
         }
         inBlink = false;
         closedFrames = 0;
       }
+      section('state');
 
       // (Optional) draw a simple point for debugging eye corners
       // Right eye corner points (33 and 133)
@@ -294,12 +536,15 @@ html_code = """
       const pA = lm[33], pB = lm[133];
       ctx.beginPath(); ctx.arc(pA.x*canvas.width, pA.y*canvas.height, 3, 0, Math.PI*2); ctx.fill();
       ctx.beginPath(); ctx.arc(pB.x*canvas.width, pB.y*canvas.height, 3, 0, Math.PI*2); ctx.fill();
+      section('draw');
     }
 
     function updateTimer(){
       const now = Date.now();
 
       if (now - minuteStart >= 60000) {
+        pendingMinutes.push({ minute: minuteIndex, started_at: minuteStart / 1000, blinks: blinkCount, complete: true, seconds: 60 });
+        flushHistory(false);
         if (blinkCount < NORMAL_MAX) {
           showReminder = true;
           reminderStart = now;
@@ -308,6 +553,7 @@ html_code = """
         blinkCount = 0;
         blinkCountDiv.textContent = blinkCount;
         minuteStart = now;
+        minuteIndex++;
       }
 
       if (showReminder && (now - reminderStart >= REMINDER_DURATION)) {
@@ -324,6 +570,7 @@ html_code = """
       if (remaining > 0) {
         setTimeout(updateTimer, 1000);
       } else {
+        flushHistory();
         statusDiv.textContent = '⏰ Session complete! Great job monitoring your blinks!';
         statusDiv.className = 'status-ready';
       }
@@ -338,6 +585,11 @@ html_code = """
     }
 
     function resetSession(){
+      flushHistory();
+      sessionId = crypto.randomUUID();
+      sessionEpoch = Date.now();
+      minuteIndex = 0;
+
       blinkCount = 0;
       minuteStart = Date.now();
       sessionStart = Date.now();
@@ -345,6 +597,7 @@ html_code = """
       emaBaseEAR = null;
       closedFrames = 0;
       inBlink = false;
+      perf = newPerf();
 
       showReminder = false;
       reminderStart = 0;
@@ -362,13 +615,150 @@ html_code = """
 
     startBtn.addEventListener('click', startCamera);
     resetBtn.addEventListener('click', resetSession);
+    perfBtn.addEventListener('click', exportPerf);
+    // Best effort: the upload may not finish if the tab is closing
+    window.addEventListener('pagehide', () => flushHistory());
   </script>
 </body>
 </html>
 """
 
-# Render the HTML component
-components.html(html_code, height=900)
+# ---------------------------
+# Server-side mode (streamlit-webrtc)
+# ---------------------------
+
+SESSION_S = 5 * 60
+NORMAL_MAX = 20
+LIVE_REFRESH_S = 0.5
+
+def session_metrics(blinks=0, remaining=SESSION_S):
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Blinks This Minute", blinks)
+    c2.metric("Time Remaining", f"{remaining // 60}:{remaining % 60:02d}")
+    c3.metric("Target Blinks/Min", "15-20")
+
+def save_server_history(proc, force: bool = False):
+    # Server-mode sessions go into the same history as browser sessions
+    batch = proc.history_batch(force)
+    if batch is None:
+        return
+    try:
+        get_history(BLINK_HISTORY_DB).ingest(batch)
+    except (ValueError, KeyError, TypeError, sqlite3.Error) as e:
+        st.warning(f"Could not save blink history: {e}")
+
+@st.fragment(run_every=LIVE_REFRESH_S)
+def live_stats(ctx):
+    # Only this block re-runs while the stream plays; frames are handled on the webrtc thread
+    proc = ctx.video_processor
+    if proc is None:
+        session_metrics()
+        st.caption("Connecting to the camera stream...")
+        return
+
+    save_server_history(proc)
+    snap = proc.snapshot()
+    remaining = max(0, SESSION_S - int(snap["elapsed_s"]))
+    session_metrics(snap["blinks_this_minute"], remaining)
+
+    last = snap["last_minute_blinks"]
+    if remaining == 0:
+        st.success("⏰ Session complete! Great job monitoring your blinks!")
+    elif last is not None and last < NORMAL_MAX:
+        st.warning(f"👁️ Only {last} blinks last minute - remember to blink!")
+
+    p50, p95 = snap["inference_p50_ms"], snap["inference_p95_ms"]
+    ear = "-" if snap["ear"] is None else f"{snap['ear']:.4f}"
+    st.caption(
+        f"Face: {'Yes' if snap['face_found'] else 'No'} · EAR: {ear} · "
+        f"Inference p50/p95: {p50 or 0:.1f}/{p95 or 0:.1f} ms · "
+        f"Frames processed: {snap['frames_processed']} · "
+        f"Dropped: {snap['drop_rate']:.0%}"
+    )
+
+def server_monitor():
+    # av / mediapipe are only needed in this mode
+    from streamlit_webrtc import webrtc_streamer, WebRtcMode
+    from webrtc_blink import BlinkVideoProcessor
+
+    stun = get_setting("WEBRTC_STUN_URL", "stun:stun.l.google.com:19302")
+    ctx = webrtc_streamer(
+        key="blink-server",
+        mode=WebRtcMode.SENDRECV,
+        video_processor_factory=BlinkVideoProcessor,
+        async_processing=True,  # newest frame only; stale frames are dropped
+        media_stream_constraints={
+            "video": {"width": {"ideal": 640}, "height": {"ideal": 480}, "frameRate": {"ideal": 30}},
+            "audio": False,
+        },
+        rtc_configuration={"iceServers": [{"urls": [stun]}]} if stun else {"iceServers": []},
+    )
+    timer.first_render()
+
+    if st.button("Reset Session", key="server_reset") and ctx.video_processor:
+        save_server_history(ctx.video_processor, force=True)
+        ctx.video_processor.reset()
+
+    if not ctx.state.playing:
+        session_metrics()
+        st.caption("Click START above and allow camera access.")
+        return
+
+    # Refreshes on its own, so history and instructions below render while the stream runs
+    live_stats(ctx)
+
+# ---------------------------
+# Session history
+# ---------------------------
+
+def store_history_batch():
+    # Batches from the component arrive through this uploader; each file is stored once
+    batch = st.file_uploader("", type=["json"], key="monitor_sync", label_visibility="collapsed")
+    if batch is None or st.session_state.get("monitor_sync_last") == batch.file_id:
+        return
+    st.session_state.monitor_sync_last = batch.file_id
+    try:
+        get_history(BLINK_HISTORY_DB).ingest(json.loads(batch.getvalue()))
+    except (ValueError, KeyError, TypeError, sqlite3.Error) as e:
+        st.warning(f"Could not save blink history: {e}")
+
+def show_history():
+    with st.expander("📈 Blink history"):
+        history = get_history(BLINK_HISTORY_DB)
+        sessions = history.recent_sessions(20)
+        if not sessions:
+            st.caption("Finished minutes of your monitoring sessions will show up here.")
+            return
+
+        daily = history.daily_summary(30)
+        if len(daily) > 1:
+            st.bar_chart({row["day"]: row["blinks_per_minute"] for row in daily})
+
+        st.dataframe(
+            [
+                {
+                    "Started": time.strftime("%Y-%m-%d %H:%M", time.localtime(s["started_at"])),
+                    "Minutes": s["minutes"],
+                    "Blinks": s["blinks"],
+                    "Blinks/min": s["blinks_per_minute"],
+                    "Fewest in a minute": s["min_blinks"],
+                    "Avg blink (ms)": s["mean_blink_ms"],
+                }
+                for s in sessions
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+if mode == MODE_SERVER:
+    server_monitor()
+else:
+    # Render the HTML component
+    components.html(html_code.replace("__MEDIAPIPE_LOADER__", loader_js()), height=900)
+    timer.first_render()
+    store_history_batch()
+
+show_history()
 
 st.markdown("---")
 
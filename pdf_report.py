@@ -0,0 +1,237 @@
+"""
+PDF report rendering.
+
+Styles are built once per process, the embedded frame is downsampled to the
+size it is actually printed at, and reports render on a background thread
+pool so the results page can show before the PDF is ready. For bulk export,
+render_reports_batch() spreads reports over a process pool (ReportLab is
+pure Python, so threads would serialize on the GIL). StreamingReport
+converts a streamed response as it arrives.
+"""
+
+import io
+import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+from reportlab.platypus import (
+    SimpleDocTemplate, Spacer, Table, TableStyle, Paragraph, Image as RLImage
+)
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+
+IMAGE_BOX = (440, 280)   # points the embedded frame is restricted to
+IMAGE_SCALE = 1.5        # pixels per point kept when downsampling
+IMAGE_QUALITY = 80
+RENDER_WORKERS = 2
+
+_SEPARATOR_ROW = re.compile(r"^[\|\s\-:]+$")
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _styles():
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        "CustomTitle",
+        parent=styles["Heading1"],
+        fontSize=16,
+        textColor=colors.HexColor("#1a1a1a"),
+        spaceAfter=14,
+        leading=20
+    )
+    normal_style = ParagraphStyle(
+        "CustomNormal",
+        parent=styles["Normal"],
+        fontSize=10,
+        spaceAfter=6,
+        leading=14
+    )
+    table_style = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#3498db")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, 0), 10),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 10),
+        ("TOPPADDING", (0, 0), (-1, 0), 10),
+        ("BACKGROUND", (0, 1), (-1, -1), colors.whitesmoke),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 1), (-1, -1), 9),
+    ])
+    return title_style, normal_style, table_style
+
+
+def downsample_image(image_bytes: bytes) -> bytes:
+    """Shrink the frame to what IMAGE_BOX prints at; small images pass through."""
+    from PIL import Image
+
+    max_w, max_h = (round(v * IMAGE_SCALE) for v in IMAGE_BOX)
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        if img.width <= max_w and img.height <= max_h:
+            return image_bytes
+        img = img.convert("RGB")
+        img.thumbnail((max_w, max_h), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=IMAGE_QUALITY, optimize=True)
+        return out.getvalue()
+
+
+class MarkdownFlowables:
+    """
+    markdown_to_flowables fed a chunk at a time, e.g. from a streamed response.
+
+    Complete lines are converted as they arrive. A pipe line is held until the
+    next one shows whether it starts a table, and table rows are collected
+    until the first line without a pipe.
+    """
+
+    def __init__(self):
+        self.story: list = []
+        self._partial = ""            # text after the last newline
+        self._held: str | None = None
+        self._table: list | None = None
+
+    def feed(self, text: str) -> "MarkdownFlowables":
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._line(line.strip())
+        return self
+
+    def finish(self) -> list:
+        self._line(self._partial.strip())
+        self._partial = ""
+        if self._table is not None:
+            self._close_table()
+        if self._held is not None:
+            self._paragraph(self._held)
+            self._held = None
+        return self.story
+
+    def _paragraph(self, text: str):
+        _, normal_style, _ = _styles()
+        self.story.append(Paragraph(text, normal_style))
+
+    def _add_row(self, row: str):
+        if _SEPARATOR_ROW.match(row):
+            return
+        cells = [cell.strip() for cell in row.split("|") if cell.strip() != ""]
+        if cells:
+            self._table.append(cells)
+
+    def _close_table(self):
+        rows, self._table = self._table, None
+        if rows:
+            t = Table(rows, hAlign="CENTER")
+            t.setStyle(_styles()[2])
+            self.story.append(t)
+            self.story.append(Spacer(1, 12))
+
+    def _line(self, stripped: str):
+        if self._table is not None:
+            if "|" in stripped:
+                self._add_row(stripped)
+                return
+            self._close_table()
+
+        if self._held is not None:
+            held, self._held = self._held, None
+            if "|" in stripped:
+                self._table = []
+                self._add_row(held)
+                self._add_row(stripped)
+                return
+            self._paragraph(held)
+
+        if not stripped:
+            self.story.append(Spacer(1, 8))
+        elif "|" in stripped:
+            self._held = stripped
+        else:
+            self._paragraph(stripped)
+
+
+def markdown_to_flowables(text_content: str) -> list:
+    """Paragraphs, blank-line spacers and pipe tables, same rules as before."""
+    return MarkdownFlowables().feed(text_content).finish()
+
+
+def _header_flowables(image_bytes: bytes | None) -> list:
+    title_style, _, _ = _styles()
+    story = [Paragraph("Eye Photo + Gemini Notes", title_style), Spacer(1, 10)]
+    if image_bytes:
+        rl_img = RLImage(io.BytesIO(downsample_image(image_bytes)))
+        rl_img._restrictSize(*IMAGE_BOX)
+        story.append(rl_img)
+        story.append(Spacer(1, 14))
+    return story
+
+
+def _build_pdf(story: list) -> bytes:
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=18
+    )
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def generate_pdf_from_text_and_image(text_content: str, image_bytes: bytes | None = None):
+    return _build_pdf(_header_flowables(image_bytes) + markdown_to_flowables(text_content))
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="pdf-report")
+    return _executor
+
+
+class StreamingReport:
+    """
+    A report built while the response streams in.
+
+    The frame is downsampled on the render pool right away and the text is
+    converted line by line in feed(), so finish() only has to lay out the
+    document.
+    """
+
+    def __init__(self, image_bytes: bytes | None = None):
+        self._header = _pool().submit(_header_flowables, image_bytes)
+        self._body = MarkdownFlowables()
+
+    def feed(self, chunk: str):
+        self._body.feed(chunk)
+
+    def finish(self) -> bytes:
+        return _build_pdf(self._header.result() + self._body.finish())
+
+
+def submit_report(text_content: str, image_bytes: bytes | None = None) -> Future:
+    """Render on the background pool; call .result() when the PDF is needed."""
+    return _pool().submit(generate_pdf_from_text_and_image, text_content, image_bytes)
+
+
+def _render_item(item):
+    return generate_pdf_from_text_and_image(*item)
+
+
+def render_reports_batch(items, max_workers: int | None = None) -> list[bytes]:
+    """Render many (text, image_bytes) reports in parallel processes, results in input order."""
+    items = list(items)
+    if len(items) <= 1:
+        return [_render_item(item) for item in items]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_render_item, items, chunksize=max(1, len(items) // 32)))
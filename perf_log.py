@@ -0,0 +1,128 @@
+"""
+Local structured performance log (one JSON object per line).
+
+Kept dependency-free so pages can import it before anything heavy and
+measure their own cold start.
+
+Summarize a stream:
+    python perf_log.py first_render
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+DEFAULT_LOG_DIR = "logs"
+
+_write_lock = threading.Lock()
+_process_start = time.perf_counter()
+_pages_seen: set[str] = set()
+
+
+def log_dir() -> str:
+    return os.getenv("PERF_LOG_DIR", DEFAULT_LOG_DIR)
+
+
+def append_record(stream: str, record: dict):
+    """Append one record to <log_dir>/<stream>.jsonl; logging never breaks the page."""
+    record = {"ts": time.time(), **record}
+    try:
+        os.makedirs(log_dir(), exist_ok=True)
+        line = json.dumps(record, default=str) + "\n"
+        with _write_lock, open(os.path.join(log_dir(), f"{stream}.jsonl"), "a", encoding="utf-8") as f:
+            f.write(line)
+    except OSError:
+        pass
+
+
+def read_records(stream: str) -> list[dict]:
+    path = os.path.join(log_dir(), f"{stream}.jsonl")
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+class PageTimer:
+    """
+    Time from the top of a page script to its first meaningful render.
+    Create it on the first line of the page, call first_render() once the
+    main content has been emitted.
+    """
+
+    def __init__(self, page: str):
+        self.page = page
+        self.start = time.perf_counter()
+        self.cold = page not in _pages_seen  # first run of this page in this process
+        _pages_seen.add(page)
+        self.elapsed_ms: float | None = None
+
+    def first_render(self, **extra) -> float:
+        if self.elapsed_ms is None:
+            self.elapsed_ms = (time.perf_counter() - self.start) * 1000
+            append_record("first_render", {
+                "page": self.page,
+                "ms": round(self.elapsed_ms, 1),
+                "cold": self.cold,
+                "process_age_s": round(self.start - _process_start, 1),
+                **extra,
+            })
+        return self.elapsed_ms
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    k = (len(ordered) - 1) * q / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(records: list[dict], group_by: str, value: str = "ms") -> dict:
+    """{group: {"n", "p50", "p95", "max"}} over records that have both fields."""
+    groups: dict[str, list[float]] = {}
+    for r in records:
+        if group_by in r and isinstance(r.get(value), (int, float)):
+            groups.setdefault(str(r[group_by]), []).append(float(r[value]))
+    return {
+        g: {
+            "n": len(v),
+            "p50": round(percentile(v, 50), 1),
+            "p95": round(percentile(v, 95), 1),
+            "max": round(max(v), 1),
+        }
+        for g, v in sorted(groups.items())
+    }
+
+
+if __name__ == "__main__":
+    stream = sys.argv[1] if len(sys.argv) > 1 else "first_render"
+    records = read_records(stream)
+    if stream == "first_render":
+        for r in records:
+            r["page_run"] = f"{r.get('page')} ({'cold' if r.get('cold') else 'warm'})"
+        table = summarize(records, "page_run")
+    elif stream == "analysis_stages":
+        # Same stage names appear in different request kinds (upload, analysis)
+        for r in records:
+            r["request_stage"] = f"{r.get('request')}/{r.get('stage')}"
+        table = summarize(records, "request_stage")
+        # Streamed Gemini calls also record the time to their first chunk
+        for name, row in summarize(records, "request_stage", "ttft_ms").items():
+            table[f"{name} ttft"] = row
+    else:
+        table = summarize(records, "stage")
+
+    print(f"{'':<32}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, row in table.items():
+        print(f"{name:<32}{row['n']:>6}{row['p50']:>10}{row['p95']:>10}{row['max']:>10}")
@@ -0,0 +1,73 @@
+"""
+Per-request stage spans for the Blink Analysis page.
+
+    with RequestProfile("analysis", frames=120) as profile:
+        with profile.span("gemini", frames=16) as span:
+            response = gemini.generate_content(contents)
+            span["bytes"] = payload_bytes
+
+Leaving the block (or calling finish()) appends one record per span, and
+one "total", to <log_dir>/analysis_stages.jsonl via perf_log, all sharing
+a request id.
+p50/p95 per stage across every request:
+    python perf_log.py analysis_stages
+"""
+
+import time
+import uuid
+from contextlib import contextmanager
+
+from perf_log import append_record
+
+STREAM = "analysis_stages"
+
+
+class RequestProfile:
+    def __init__(self, request: str, **fields):
+        self.request = request
+        self.request_id = uuid.uuid4().hex[:12]
+        self.fields = fields           # request-level attributes (frames, mode, ...)
+        self.spans: list[dict] = []
+        self.start = time.perf_counter()
+        self.total_ms: float | None = None
+
+    @contextmanager
+    def span(self, stage: str, **attrs):
+        """Time a stage. The yielded dict can be filled in while the stage runs."""
+        record = {"stage": stage, **attrs}
+        t0 = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            self.spans.append(record)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Failed requests are logged too, marked with the exception type
+        self.finish(**({"error": exc_type.__name__} if exc_type else {}))
+        return False
+
+    def finish(self, **fields) -> list[dict]:
+        if self.total_ms is not None:
+            return self.spans
+        self.fields.update(fields)
+        self.total_ms = round((time.perf_counter() - self.start) * 1000, 1)
+
+        base = {"request_id": self.request_id, "request": self.request, **self.fields}
+        for record in self.spans:
+            append_record(STREAM, {**base, **record})
+        append_record(STREAM, {**base, "stage": "total", "ms": self.total_ms})
+        return self.spans
+
+    def rows(self) -> list[dict]:
+        """Spans plus the total, for display."""
+        rows = [dict(r) for r in self.spans]
+        if self.total_ms is not None:
+            rows.append({"stage": "total", "ms": self.total_ms})
+        return rows
@@ -1,5 +1,11 @@
+from perf_log import PageTimer
+
+timer = PageTimer("home")
+
 import streamlit as st
 
+from assets import resized_asset
+
 st.set_page_config(
     page_title="Blink Smart",
     page_icon="👁️",
@@ -9,9 +15,9 @@ st.set_page_config(
 # Main landing page with both logos
 col_logo1, col_logo2, col_title = st.columns([1, 2, 3])
 with col_logo1:
-    st.image("1771169157130_image.png", width=150)
+    st.image(resized_asset("1771169157130_image.png", 150), width=150)
 with col_logo2:
-    st.image("blink_logo.png", width=400)
+    st.image(resized_asset("blink_logo.png", 400), width=400)
 with col_title:
     st.title("👁️ Blink Smart")
     st.markdown("### Complete eye health monitoring and analysis")
@@ -71,3 +77,5 @@ Regular blinking is essential for:
 
 st.markdown("---")
 st.markdown("💡 **Tip**: Choose the tool that best fits your current needs!")
+
+timer.first_render()
@@ -0,0 +1,34 @@
+"""
+Runtime settings, read the same way as GEMINI_API_KEY:
+Streamlit secrets first, then environment variables, then the default.
+"""
+
+import os
+
+_TRUE = {"1", "true", "yes", "on"}
+
+
+def get_setting(name: str, default=None, cast=str):
+    value = None
+    try:
+        import streamlit as st
+
+        # Only touch st.secrets when a secrets.toml exists: reading it otherwise
+        # puts a "No secrets found" error on the page
+        if st.secrets.load_if_toml_exists():
+            value = st.secrets.get(name)
+    except Exception:
+        # Running outside Streamlit (CLI, benchmarks) or an unreadable secrets.toml
+        value = None
+
+    if value is None:
+        value = os.getenv(name)
+    if value is None:
+        return default
+
+    if cast is bool:
+        return value if isinstance(value, bool) else str(value).strip().lower() in _TRUE
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return default
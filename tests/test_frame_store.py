@@ -0,0 +1,58 @@
+import gc
+
+from frame_store import FrameStore, FrameStoreRegistry
+
+FRAMES = [b"frame-0", b"frame-1", b"frame-2"]
+
+
+def test_evicted_store_stays_readable_while_held():
+    registry = FrameStoreRegistry(max_stores=1)
+    registry.put("a", FrameStore(FRAMES))
+    reader = registry.get("a")
+
+    registry.put("b", FrameStore([b"other"]))  # evicts "a"
+    assert registry.get("a") is None
+
+    assert not reader.closed
+    assert bytes(reader[0]) == b"frame-0"
+    assert [bytes(f) for f in reader] == FRAMES
+
+
+def test_expired_store_stays_readable_while_held():
+    registry = FrameStoreRegistry(ttl_s=60)
+    registry.put("a", FrameStore(FRAMES))
+    reader = registry.get("a")
+
+    reader.last_access -= 120
+    assert registry.get("a") is None  # expired on lookup
+    assert bytes(reader[-1]) == b"frame-2"
+
+
+def test_dropped_store_is_released_with_its_last_reference():
+    registry = FrameStoreRegistry(max_stores=1)
+    store = FrameStore(FRAMES)
+    registry.put("a", store)
+    finalizer = store._finalizer
+
+    registry.put("b", FrameStore([b"other"]))
+    assert finalizer.alive
+    del store
+    gc.collect()
+    assert not finalizer.alive
+
+
+def test_shared_store_survives_other_uploads():
+    # Two sessions upload the same capture; later uploads push it out of the registry
+    registry = FrameStoreRegistry(max_stores=2)
+    first = registry.setdefault("same-capture", FrameStore(FRAMES))
+    duplicate = FrameStore(FRAMES)
+    second = registry.setdefault("same-capture", duplicate)
+    assert second is first
+    assert duplicate.closed
+
+    for i in range(3):
+        registry.setdefault(f"upload-{i}", FrameStore([b"other"]))
+    assert registry.get("same-capture") is None
+
+    assert bytes(first[1]) == b"frame-1"
+    assert bytes(second[2]) == b"frame-2"
@@ -0,0 +1,36 @@
+import pytest
+from streamlit import config
+
+import vendor_assets
+
+
+@pytest.fixture
+def base_url_path():
+    original = config.get_option("server.baseUrlPath")
+    yield lambda value: config.set_option("server.baseUrlPath", value)
+    config.set_option("server.baseUrlPath", original)
+
+
+@pytest.mark.parametrize("base, expected", [
+    ("", "/app/static/vendor"),
+    ("blink", "/blink/app/static/vendor"),
+    ("/apps/blink/", "/apps/blink/app/static/vendor"),
+])
+def test_static_url_follows_base_url_path(base_url_path, base, expected):
+    base_url_path(base)
+    assert vendor_assets.static_url() == expected
+
+
+def test_vendored_asset_urls_use_base_url_path(base_url_path, tmp_path, monkeypatch):
+    _, version, files = vendor_assets.PACKAGES["face_mesh"]
+    (tmp_path / "face_mesh").mkdir()
+    (tmp_path / "face_mesh" / files[0]).write_bytes(b"js")
+    manifest = {f"face_mesh/{files[0]}": {"version": version, "sha256": "ab" * 32}}
+    monkeypatch.setattr(vendor_assets, "VENDOR_DIR", tmp_path)
+    monkeypatch.setattr(vendor_assets, "load_manifest", lambda: manifest)
+    monkeypatch.setattr(vendor_assets, "_static_serving", lambda: True)
+    base_url_path("blink")
+
+    urls = vendor_assets.asset_urls()
+    assert urls[files[0]]["url"] == f"/blink/app/static/vendor/face_mesh/{files[0]}?v={'ab' * 6}"
+    assert urls[files[1]]["url"] == vendor_assets.cdn_url("face_mesh", files[1])
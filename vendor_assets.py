@@ -0,0 +1,236 @@
+"""
+Self-hosted MediaPipe FaceMesh for the camera pages.
+
+    python vendor_assets.py            # download the pinned files into static/vendor/
+    python vendor_assets.py --check    # verify them against static/vendor/manifest.json
+
+Streamlit serves ./static at <server.baseUrlPath>/app/static/
+(server.enableStaticServing in .streamlit/config.toml). URLs carry ?v=<content hash>, which makes Tornado
+send a ten-year Cache-Control, so each file is downloaded once per browser
+until it changes. Files that are not vendored load from the CDN as before.
+
+static/vendor/ is not in git: deploys run `python vendor_assets.py` before
+starting the app, and CI (.github/workflows/vendor-assets.yml) runs the
+download and --check so a broken pin or manifest fails the build.
+
+Static files are served as text/plain with nosniff, so the browser would
+refuse them as scripts or WASM. loader_js() fetches every file and hands
+MediaPipe Blob URLs with the right MIME types instead.
+"""
+
+import hashlib
+import json
+import sys
+import urllib.request
+from functools import lru_cache
+from pathlib import Path
+
+VENDOR_DIR = Path(__file__).resolve().parent / "static" / "vendor"
+MANIFEST_PATH = VENDOR_DIR / "manifest.json"
+STATIC_PATH = "app/static/vendor"
+CDN_URL = "https://cdn.jsdelivr.net/npm"
+
+# package -> (npm name, pinned version, files)
+PACKAGES = {
+    "face_mesh": (
+        "@mediapipe/face_mesh",
+        "0.4.1633559619",
+        [
+            "face_mesh.js",
+            "face_mesh.binarypb",
+            "face_mesh_solution_packed_assets.data",
+            "face_mesh_solution_packed_assets_loader.js",
+            "face_mesh_solution_simd_wasm_bin.js",
+            "face_mesh_solution_simd_wasm_bin.wasm",
+            "face_mesh_solution_wasm_bin.js",
+            "face_mesh_solution_wasm_bin.wasm",
+        ],
+    ),
+}
+
+MIME_TYPES = {".js": "text/javascript", ".wasm": "application/wasm"}
+
+
+def cdn_url(package: str, file: str) -> str:
+    npm_name, version, _ = PACKAGES[package]
+    return f"{CDN_URL}/{npm_name}@{version}/{file}"
+
+
+def mime_type(file: str) -> str:
+    return MIME_TYPES.get(Path(file).suffix, "application/octet-stream")
+
+
+@lru_cache(maxsize=1)
+def load_manifest() -> dict:
+    try:
+        return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _static_serving() -> bool:
+    try:
+        from streamlit import config
+
+        return bool(config.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+def static_url() -> str:
+    """URL prefix of static/vendor/, under server.baseUrlPath when the app is served below a path."""
+    try:
+        from streamlit import config
+
+        base = (config.get_option("server.baseUrlPath") or "").strip("/")
+    except Exception:
+        base = ""
+    return f"/{base}/{STATIC_PATH}" if base else f"/{STATIC_PATH}"
+
+
+def asset_urls(package: str = "face_mesh") -> dict:
+    """file -> {"url", "type"}: the vendored copy when present and current, else the CDN."""
+    _, version, files = PACKAGES[package]
+    manifest = load_manifest()
+    local = _static_serving()
+    prefix = static_url()
+    assets = {}
+    for file in files:
+        entry = manifest.get(f"{package}/{file}")
+        if local and entry and entry["version"] == version and (VENDOR_DIR / package / file).exists():
+            url = f"{prefix}/{package}/{file}?v={entry['sha256'][:12]}"
+        else:
+            url = cdn_url(package, file)
+        assets[file] = {"url": url, "type": mime_type(file)}
+    return assets
+
+
+_LOADER_JS = """
+// MediaPipe FaceMesh, from the app's static files when vendored (vendor_assets.py).
+// Every file is fetched and passed on as a Blob URL with its real MIME type.
+const MEDIAPIPE_ASSETS = __ASSETS__;
+const mediapipeBlobs = {};
+// SIMD feature test (a minimal module using v128), the same check MediaPipe makes
+const WASM_SIMD = WebAssembly.validate(new Uint8Array([
+    0, 97, 115, 109, 1, 0, 0, 0, 1, 5, 1, 96, 0, 1, 123, 3, 2, 1, 0, 10, 10, 1, 8, 0, 65, 0, 253, 15, 253, 98, 11
+]));
+
+async function fetchMediaPipeAsset(file) {
+    const asset = MEDIAPIPE_ASSETS[file];
+    const response = await fetch(asset.url);
+    if (!response.ok) throw new Error(`${file}: HTTP ${response.status}`);
+    const data = await response.blob();
+    mediapipeBlobs[file] = URL.createObjectURL(new Blob([data], { type: asset.type }));
+}
+
+function loadScript(src) {
+    return new Promise((resolve, reject) => {
+        const script = document.createElement('script');
+        script.src = src;
+        script.onload = resolve;
+        script.onerror = () => reject(new Error(`could not load ${src}`));
+        document.head.appendChild(script);
+    });
+}
+
+function locateMediaPipeFile(file) {
+    return mediapipeBlobs[file] || (MEDIAPIPE_ASSETS[file] && MEDIAPIPE_ASSETS[file].url) || file;
+}
+
+// Fetches what this browser needs, builds a FaceMesh and runs one blank frame
+// through it, so the model and shaders are ready before the camera starts.
+async function loadFaceMesh(options) {
+    const unused = WASM_SIMD ? 'face_mesh_solution_wasm_bin.wasm' : 'face_mesh_solution_simd_wasm_bin.wasm';
+    await Promise.all(Object.keys(MEDIAPIPE_ASSETS).filter(f => f !== unused).map(fetchMediaPipeAsset));
+    if (!window.FaceMesh) await loadScript(mediapipeBlobs['face_mesh.js']);
+
+    const faceMesh = new window.FaceMesh({ locateFile: locateMediaPipeFile });
+    faceMesh.setOptions(options);
+    faceMesh.onResults(() => {});
+    await faceMesh.initialize();
+    const blank = document.createElement('canvas');
+    blank.width = 64;
+    blank.height = 48;
+    blank.getContext('2d').fillRect(0, 0, blank.width, blank.height);
+    await faceMesh.send({ image: blank });
+    return faceMesh;
+}
+"""
+
+
+def loader_js(package: str = "face_mesh") -> str:
+    """JS defining loadFaceMesh(options) -> Promise<FaceMesh>, for the page components."""
+    return _LOADER_JS.replace("__ASSETS__", json.dumps(asset_urls(package)))
+
+
+# ---------------------------
+# Download / verify
+# ---------------------------
+
+def fetch_assets(force: bool = False) -> dict:
+    """Download every pinned file that is missing or stale; returns the new manifest."""
+    manifest = dict(load_manifest())
+    for package, (_, version, files) in PACKAGES.items():
+        (VENDOR_DIR / package).mkdir(parents=True, exist_ok=True)
+        for file in files:
+            key = f"{package}/{file}"
+            path = VENDOR_DIR / package / file
+            entry = manifest.get(key)
+            if not force and entry and entry["version"] == version and path.exists():
+                continue
+            url = cdn_url(package, file)
+            print(f"fetching {url}", file=sys.stderr)
+            with urllib.request.urlopen(url, timeout=60) as response:
+                data = response.read()
+            path.write_bytes(data)
+            manifest[key] = {
+                "version": version,
+                "source": url,
+                "bytes": len(data),
+                "sha256": hashlib.sha256(data).hexdigest(),
+            }
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    load_manifest.cache_clear()
+    return manifest
+
+
+def check_assets() -> list[str]:
+    """Problems with the vendored files (missing, stale or modified); empty when all is well."""
+    manifest = load_manifest()
+    problems = []
+    for package, (_, version, files) in PACKAGES.items():
+        for file in files:
+            key = f"{package}/{file}"
+            entry = manifest.get(key)
+            path = VENDOR_DIR / package / file
+            if entry is None or not path.exists():
+                problems.append(f"{key}: missing")
+            elif entry["version"] != version:
+                problems.append(f"{key}: version {entry['version']}, pinned {version}")
+            elif hashlib.sha256(path.read_bytes()).hexdigest() != entry["sha256"]:
+                problems.append(f"{key}: content does not match the manifest")
+    return problems
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Vendor the MediaPipe files the camera pages load.")
+    parser.add_argument("--check", action="store_true", help="verify instead of downloading")
+    parser.add_argument("--force", action="store_true", help="download again even if up to date")
+    args = parser.parse_args()
+
+    if args.check:
+        problems = check_assets()
+        if problems:
+            print(f"Vendored MediaPipe files in {VENDOR_DIR} are not usable:", file=sys.stderr)
+            for line in problems:
+                print(f"  {line}", file=sys.stderr)
+            print("Run `python vendor_assets.py` (needs network access) to download the pinned files. "
+                  "Until then the camera pages load them from the CDN.", file=sys.stderr)
+            sys.exit(1)
+        print(f"{sum(len(files) for _, _, files in PACKAGES.values())} vendored files match the manifest")
+
+    manifest = fetch_assets(args.force)
+    total = sum(entry["bytes"] for entry in manifest.values())
+    print(f"{len(manifest)} files, {total / 1024 / 1024:.1f} MB in {VENDOR_DIR}")
@@ -0,0 +1,166 @@
+"""
+Server-side live blink detection for the Blink Monitor (streamlit-webrtc).
+
+Frames arrive through a WebRTC video processor and FaceMesh + EAR run in
+Python. With async processing, recv_queued() gets every frame that arrived
+since the previous call; only the newest is processed and the rest are
+dropped, so a slow server falls behind by at most one frame instead of
+building a queue. The page polls snapshot() for live counts and timings,
+and history_batch() for blink history in the same batch format the browser
+monitor sends (see blink_history.py).
+"""
+
+import threading
+import time
+import uuid
+from collections import deque
+
+import av
+import numpy as np
+from streamlit_webrtc import VideoProcessorBase
+
+from blink_engine import StreamingBlinkDetector, create_face_mesh, eye_points
+
+MINUTE_MS = 60_000
+TIMING_WINDOW = 120  # frames kept for the inference-time percentiles
+HISTORY_FLUSH_S = 10  # a running minute's rollup is sent at most this often
+
+
+class BlinkVideoProcessor(VideoProcessorBase):
+    def __init__(self):
+        # Own FaceMesh per stream: tracking state must not mix between users
+        self.face_mesh = create_face_mesh()
+        self.detector = StreamingBlinkDetector()
+        self._lock = threading.Lock()
+
+        self.session_start = time.monotonic()
+        self.minute_start = self.session_start
+        self.blinks_this_minute = 0
+        self.last_minute_blinks: int | None = None
+        self.total_blinks = 0
+        self.face_found = False
+        self._new_history_session()
+
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.inference_ms: deque[float] = deque(maxlen=TIMING_WINDOW)
+
+    def _process(self, frame: av.VideoFrame) -> av.VideoFrame:
+        import cv2
+
+        img = frame.to_ndarray(format="bgr24")
+
+        t0 = time.perf_counter()
+        pts = eye_points(self.face_mesh, img)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        now = time.monotonic()
+
+        with self._lock:
+            blink_ms = self.detector.update(pts, now * 1000)
+            eyes_closed = self.detector.eyes_closed
+            self.frames_processed += 1
+            self.inference_ms.append(elapsed_ms)
+            self.face_found = pts is not None
+            if (now - self.minute_start) * 1000 >= MINUTE_MS:
+                self._pending_minutes.append(self._minute_rollup(complete=True))
+                self.last_minute_blinks = self.blinks_this_minute
+                self.blinks_this_minute = 0
+                self.minute_start = now
+                self.minute_epoch = time.time()
+                self.minute_index += 1
+            if blink_ms is not None:
+                self.blinks_this_minute += 1
+                self.total_blinks += 1
+                self._pending_events.append({"t": time.time(), "duration_ms": float(blink_ms), "minute": self.minute_index})
+
+        if pts is not None:
+            color = (60, 76, 231) if eyes_closed else (96, 174, 39)
+            for x, y in pts.astype(int):
+                cv2.circle(img, (int(x), int(y)), 2, color, -1)
+
+        return av.VideoFrame.from_ndarray(img, format="bgr24")
+
+    async def recv_queued(self, frames: list[av.VideoFrame]) -> list[av.VideoFrame]:
+        with self._lock:
+            self.frames_received += len(frames)
+            self.frames_dropped += len(frames) - 1
+        return [self._process(frames[-1])]
+
+    def recv(self, frame: av.VideoFrame) -> av.VideoFrame:
+        with self._lock:
+            self.frames_received += 1
+        return self._process(frame)
+
+    def reset(self):
+        """Start a new session; take the old one's history_batch(force=True) first."""
+        with self._lock:
+            self.detector.reset()
+            self.session_start = self.minute_start = time.monotonic()
+            self.blinks_this_minute = 0
+            self.last_minute_blinks = None
+            self.total_blinks = 0
+            self._new_history_session()
+
+    # ---------------------------
+    # History
+    # ---------------------------
+
+    def _new_history_session(self):
+        self.session_id = uuid.uuid4().hex
+        self.session_epoch = self.minute_epoch = time.time()
+        self.minute_index = 0
+        self._pending_events: list[dict] = []
+        self._pending_minutes: list[dict] = []
+        self._last_flush = time.monotonic()
+
+    def _minute_rollup(self, complete: bool) -> dict:
+        return {
+            "minute": self.minute_index,
+            "started_at": self.minute_epoch,
+            "blinks": self.blinks_this_minute,
+            "complete": complete,
+            "seconds": 60.0 if complete else time.monotonic() - self.minute_start,
+        }
+
+    def history_batch(self, force: bool = False) -> dict | None:
+        """Blinks and minute rollups since the last batch, or None if nothing is due."""
+        with self._lock:
+            now = time.monotonic()
+            due = self._pending_events or self._pending_minutes or now - self._last_flush >= HISTORY_FLUSH_S
+            if not (due or force):
+                return None
+            minutes = list(self._pending_minutes)
+            # Same rule as the browser: a running minute is sent once it has a blink or 10 s
+            if self.blinks_this_minute or now - self.minute_start >= 10:
+                minutes.append(self._minute_rollup(complete=False))
+            if not self._pending_events and not minutes:
+                return None
+            batch = {
+                "session_id": self.session_id,
+                "source": "server",
+                "started_at": self.session_epoch,
+                "events": self._pending_events,
+                "minutes": minutes,
+            }
+            self._pending_events, self._pending_minutes = [], []
+            self._last_flush = now
+            return batch
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            timings = np.array(self.inference_ms) if self.inference_ms else None
+            received = self.frames_received
+            return {
+                "blinks_this_minute": self.blinks_this_minute,
+                "last_minute_blinks": self.last_minute_blinks,
+                "total_blinks": self.total_blinks,
+                "elapsed_s": time.monotonic() - self.session_start,
+                "face_found": self.face_found,
+                "ear": self.detector.last_ear,
+                "threshold": self.detector.threshold,
+                "frames_processed": self.frames_processed,
+                "drop_rate": self.frames_dropped / received if received else 0.0,
+                "inference_p50_ms": None if timings is None else float(np.percentile(timings, 50)),
+                "inference_p95_ms": None if timings is None else float(np.percentile(timings, 95)),
+            }